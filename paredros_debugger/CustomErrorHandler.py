@@ -22,15 +22,11 @@ Attributes:
     None
 """
 
-from antlr4.Token import Token
-from antlr4.atn.ATNState import ATNState
 from antlr4.error.Errors import RecognitionException
-from antlr4.atn.Transition import AtomTransition, SetTransition, RuleTransition
 from antlr4.error.ErrorStrategy import DefaultErrorStrategy
 from antlr4.Parser import Parser
 
 from paredros_debugger.ParseTraversal import ParseTraversal
-from paredros_debugger.utils import copy_token_stream
 
 # Parser = None
 
@@ -69,6 +65,16 @@ class CustomDefaultErrorStrategy(DefaultErrorStrategy):
         self.current_node = None
         self.error_occurred = False
 
+    def reset(self, recognizer:Parser):
+        """
+        Called by the parser when it is reset. Drops the memoized alternatives of the
+        traversal since they are only valid for the token stream of the previous run.
+
+        Args:
+            recognizer (Parser): The parser instance.
+        """
+        super().reset(recognizer)
+        self.traversal.reset_decision_memo()
 
     def reportError(self, recognizer:Parser, e:RecognitionException):
         """
@@ -14,7 +14,6 @@ a complete picture of the parsing process.
 """
 
 from antlr4 import *
-from paredros_debugger.utils import copy_token_stream
 from paredros_debugger.ParseTraversal import ParseTraversal
 
 class LookaheadVisualizer(ParserATNSimulator):
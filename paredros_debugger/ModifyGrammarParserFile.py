@@ -1,37 +1,80 @@
+import itertools
+import os
 import re
+import shutil
+import tempfile
+
+# The generated parser class, e.g. "class MyGrammarParser ( Parser ):"
+_CLASS_RE = re.compile(r'^(\s*class\s+\w+\s*\(\s*)Parser(\s*\).*)$')
+# A parser class that already derives from our CustomParser
+_CUSTOM_CLASS_RE = re.compile(r'^\s*class\s+\w+\s*\(\s*CustomParser\s*\)')
+# An existing import of our CustomParser
+_CUSTOM_IMPORT_RE = re.compile(
+    r'^\s*from\s+paredros_debugger\s+import\s+CustomParser|^\s*from\s+paredros_debugger\.CustomParser\s+import\s+CustomParser'
+)
+_CUSTOM_IMPORT = 'from paredros_debugger.CustomParser import CustomParser\n'
+# Marks a modified parser file, an already modified file is left as it is
+_MODIFIED_MARKER = '# paredros-modified\n'
+# A source encoding declaration (PEP 263), only honoured on the first two lines of a file
+_CODING_RE = re.compile(r'^[ \t\f]*#.*?coding[:=]')
+
+class ParserModificationError(ValueError):
+    """Raised by modify_parser_file if the file contains no generated parser class."""
 
 def modify_parser_file(filename):
     """
     Modifies ANTLR-generated parser files to use our custom parser implementation.
     This script replaces the base Parser class with our CustomParser class to enable
     parsing event interception and traversal tracking.
+    The file is rewritten in a single pass into a temporary file, which then replaces it.
+    The rewritten file gets a marker comment, placed after ANTLR's "# encoding: utf-8" line so that
+    declaration stays on the first two lines. A file with the marker in its first three lines is not
+    read any further.
 
     Args:
         filename (str): The path to the parser file to modify
 
     Returns:
         None
+
+    Raises:
+        ParserModificationError: If the file has no parser class, the file is then left unchanged
     """
     with open(filename, 'r', encoding="utf-8") as file:
-        lines = file.readlines()
-
-    modified_lines = []
-    import_added = False
-    class_pattern = re.compile(r'^(\s*class\s+\w+\s*\(\s*)Parser(\s*\).*)$')
-
-    for line in lines:
-        if class_pattern.match(line):
-            line = class_pattern.sub(r'\1CustomParser\2', line)
-        modified_lines.append(line)
+        if _MODIFIED_MARKER in itertools.islice(file, 3):
+            return
 
-    # Check if an import for CustomParser is already present
-    for line in modified_lines:
-        if re.match(r'^\s*from\s+paredros_debugger\s+import\s+CustomParser|^\s*from\s+paredros_debugger\.CustomParser\s+import\s+CustomParser', line):
-            import_added = True
-            break
+    directory = os.path.dirname(os.path.abspath(filename))
+    tmp = tempfile.NamedTemporaryFile('w', encoding="utf-8", dir=directory, suffix='.tmp', delete=False)
+    try:
+        with open(filename, 'r', encoding="utf-8") as file, tmp:
+            head = [line for line in (file.readline(), file.readline()) if line]
+            marker_at = next((i + 1 for i, line in enumerate(head) if _CODING_RE.match(line)), 0)
+            import_added = False
+            class_found = False
+            for index, line in enumerate(itertools.chain(head, file)):
+                if index == marker_at:
+                    tmp.write(_MODIFIED_MARKER)
+                # Cheap substring checks first, the patterns only run on lines that can match
+                if 'paredros_debugger' in line and _CUSTOM_IMPORT_RE.match(line):
+                    import_added = True
+                elif 'Parser' in line and _CLASS_RE.match(line):
+                    # The import has to come before the class that uses it
+                    if not import_added:
+                        tmp.write(_CUSTOM_IMPORT)
+                        import_added = True
+                    line = _CLASS_RE.sub(r'\1CustomParser\2', line)
+                    class_found = True
+                elif 'CustomParser' in line and _CUSTOM_CLASS_RE.match(line):
+                    # Modified before the marker existed, only usable if the import comes first
+                    class_found = class_found or import_added
+                tmp.write(line)
 
-    if not import_added:
-        modified_lines.insert(0, 'from paredros_debugger.CustomParser import CustomParser\n')
+            if not class_found:
+                raise ParserModificationError(f"No generated parser class found in {filename}")
 
-    with open(filename, 'w', encoding="utf-8") as file:
-        file.writelines(modified_lines)
+        shutil.copymode(filename, tmp.name)
+        os.replace(tmp.name, filename)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
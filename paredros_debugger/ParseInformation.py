@@ -15,10 +15,11 @@ from antlr4.atn.PredictionMode import PredictionMode
 from paredros_debugger.LookaheadVisualizer import LookaheadVisualizer
 from paredros_debugger.DetailedParseListener import DetailedParseListener
 from paredros_debugger.UserGrammar import UserGrammar
-from paredros_debugger.ParseTreeExplorer import ParseTreeExplorer
+from paredros_debugger.ParseTreeExplorer import ParseTreeExplorer, NoMoreAlternatives
 from paredros_debugger.ParseTraceTree import ParseTraceTree
 from paredros_debugger.ParseTraversal import ParseTraversal
-from paredros_debugger.utils import generate_parser, modify_generated_parser, load_parser_and_lexer, get_start_rule
+from paredros_debugger.ModifyGrammarParserFile import ParserModificationError
+from paredros_debugger.utils import prepare_grammar
 
 class ParseInformation:
     """Handles the parsing of input using an ANTLR-generated parser and exposes the parse tree."""
@@ -41,6 +42,7 @@ class ParseInformation:
         self.input_stream = None
         self.traversal: ParseTraversal = None
         self.name_without_ext = None
+        self.start_rule = None
 
         if not os.path.exists(self.grammar_file) or not os.path.isfile(self.grammar_file):
             raise FileNotFoundError(f"The grammar file {self.grammar_file} does not exist or is not a file.")
@@ -56,20 +58,17 @@ class ParseInformation:
         self.name_without_ext = os.path.splitext(basename)[0]  # Extracts Grammar name
         print("name_without_ext", self.name_without_ext)
 
+        # Generates, modifies and loads the parser (skipped for a grammar prepared before)
         try:
-            generate_parser(grammar_folder_path, basename)
+            self.lexer_class, self.parser_class, self.start_rule = prepare_grammar(self.grammar_folder, basename)
             print("Parser generated successfully.")
-        except subprocess.CalledProcessError:
+        except subprocess.CalledProcessError as e:
             print("Error: Failed to generate parser with ANTLR4.")
+            if e.stderr:
+                print(e.stderr, end="")
             sys.exit(1)
-
-
-
-        try:
-            modify_generated_parser(grammar_folder_path + "/" + self.name_without_ext + "Parser.py")
-            print("Parser modification completed.")
-        except subprocess.CalledProcessError:
-            print("Error: Failed to modify the generated parser.")
+        except ParserModificationError as e:
+            print(f"Error: Failed to modify the generated parser: {e}")
             sys.exit(1)
     
     def parse(self, input_file):
@@ -95,8 +94,6 @@ class ParseInformation:
         
         print("======= Reading input file =======")
         self.input_text = input_text
-        print("======= Load parser and lexer =======")
-        self.lexer_class, self.parser_class = load_parser_and_lexer(self.grammar_folder, self.name_without_ext)
         print("======= Parsing input text =======")
         print("input stream")
         self.input_stream = InputStream(self.input_text)
@@ -113,7 +110,6 @@ class ParseInformation:
         self.walker = ParseTreeWalker()
         self.listener = DetailedParseListener(self.parser)
 
-        self.start_rule = get_start_rule(self.grammar_file)
         print("start rule", self.start_rule)
         parse_method = getattr(self.parser, self.start_rule)
         tree = parse_method()
@@ -122,8 +118,7 @@ class ParseInformation:
         print(self.simple_parse_tree)
 
         self.traversal = self.parser._errHandler.traversal
-        merged_groups = self.traversal.group_and_merge()
-        self.traversal.replace_merged_nodes(merged_groups)
+        self.traversal.merge_and_replace()
         self.traversal._fix_node_ids()
 
         self.parse_trace_tree = ParseTraceTree()
@@ -147,7 +142,10 @@ class ParseInformation:
         return self.explorer.step_back_until_previous_decision()
     
     def explore_alternatives(self) -> int:
-        self.explorer.expand_alternatives()
+        try:
+            self.explorer.expand_alternatives()
+        except NoMoreAlternatives:
+            return 0
         return len(self.explorer._expanded_alt_nodes)
 
     def choose_alternative(self, alt_index: int) -> None:
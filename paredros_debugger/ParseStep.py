@@ -28,22 +28,31 @@ Example node types:
 - Error: Parsing failure point
 """
 
-from pprint import pprint
 import json
+import sys
 from typing import Any, List, Tuple
 
-from antlr4.atn.Transition import Transition, AtomTransition, SetTransition
+from antlr4.atn.Transition import AtomTransition, SetTransition
 from antlr4.atn.ATNState import ATNState
-from antlr4 import Token
 from antlr4.BufferedTokenStream import TokenStream
 from antlr4.Parser import Parser
 
 class ParseStep:
+    # Parse steps are created for every parser event, so they use slots instead of a __dict__
+    __slots__ = (
+        "id", "node_type", "is_error_node",
+        "previous_node", "next_node", "alternative_branches",
+        "rule_name", "state",
+        "current_token", "token_stream", "input_text", "lookahead",
+        "next_input_token", "next_input_literal",
+        "chosen_transition_index", "_possible_transitions", "num_alternatives", "matching_error",
+    )
+
     def __init__(self, 
                  atn_state: Any, 
                  current_token: Any, 
                  lookahead: List[Any], 
-                 possible_transitions: List[Tuple[int, List[str]]], 
+                 possible_transitions: List[Tuple[int, Tuple[str, ...]]], 
                  input_text: str, 
                  rule: str, 
                  node_type: str, 
@@ -53,7 +62,7 @@ class ParseStep:
         Initialize a new parse node.
 
         Args:
-            atn_state: ATN state number or object
+            atn_state: ATN state number or object (stored as the state number)
             current_token: Current token being processed
             lookahead: List of upcoming tokens
             possible_transitions: Available parsing paths to traverse into as (state, tokens) pairs
@@ -67,8 +76,12 @@ class ParseStep:
         """
 
         # Node information
-        self.id = (previous_id + 1) if isinstance(previous_id, int) and previous_id >= 0 else 0
-        self.node_type = node_type # "Decision", "Rule entry", "Rule exit", "Token consume", "Error"
+        # Step ids start out as ints, only add_alternative_node assigns the "N.i" form later on
+        assert isinstance(previous_id, int), "ParseStep previous_id must be an int"
+        self.id = (previous_id + 1) if previous_id >= 0 else 0
+        # Interned, so that the few distinct types (and rule names below) are shared by all steps
+        # and compared by identity first, including the "Merged ..." types built by the traversal
+        self.node_type = sys.intern(node_type) if node_type else node_type # "Decision", "Rule entry", "Rule exit", "Token consume", "Error"
         self.is_error_node = False
 
         # Graph relationships
@@ -77,8 +90,8 @@ class ParseStep:
         self.alternative_branches: List[ParseStep] = []
 
         # Rule and grammar context
-        self.rule_name = rule
-        self.state = atn_state
+        self.rule_name = sys.intern(rule) if rule else rule
+        self.state: int = atn_state.stateNumber if isinstance(atn_state, ATNState) else atn_state
 
         # Token and input information
         self.current_token = current_token
@@ -90,9 +103,20 @@ class ParseStep:
 
         # Decision tracking
         self.chosen_transition_index = -1
-        self.possible_transitions: List[Tuple[int, List[str]]] = possible_transitions
+        self.possible_transitions = possible_transitions
         self.matching_error = False
 
+    @property
+    def possible_transitions(self) -> List[Tuple[int, Tuple[str, ...]]]:
+        """Available parsing paths as (state, tokens) pairs"""
+        return self._possible_transitions
+
+    @possible_transitions.setter
+    def possible_transitions(self, transitions: List[Tuple[int, Tuple[str, ...]]]):
+        # num_alternatives is read on every step by the explorer, keep it next to the list
+        self._possible_transitions = transitions
+        self.num_alternatives: int = len(transitions)
+
     def add_next_node(self, next_node: 'ParseStep'):
         """
         Add a sequential transition to the next node in the parse traversal.
@@ -125,17 +149,22 @@ class ParseStep:
         alt_node.previous_node = self
         alt_node.id = str(self.id) + "." + str(len(self.alternative_branches))
 
+    @property
+    def is_committed(self) -> bool:
+        """True if the parser took one of the possible transitions (1-based chosen_transition_index)"""
+        return self.chosen_transition_index > 0
+
     def set_error(self):
         """Mark this node as having an error"""
         self.is_error_node = True
 
     def get_next_step_as_json(self):
-        """Returns the object's attributes as a dictionary."""
-        return json.dumps(vars(self.next_node), indent=4, ensure_ascii=False)
+        """Returns the next step's attributes as a JSON string."""
+        return json.dumps(self.next_node.to_dict(), indent=4, ensure_ascii=False)
 
     def get_step_as_json(self):
         """Returns the object's attributes as a JSON string."""
-        return json.dumps(vars(self), indent=4, ensure_ascii=False)
+        return json.dumps(self.to_dict(), indent=4, ensure_ascii=False)
 
     def matches_rule_entry(self, ruleName: str) -> bool:
         """
@@ -221,10 +250,7 @@ class ParseStep:
         Returns:
             bool: True if there is a mismatch, False if tokens match or no token expected
         """
-        if not hasattr(self.state, 'transitions'):
-            atn_state = recognizer._interp.atn.states[self.state]
-        else:
-            atn_state = self.state
+        atn_state = recognizer._interp.atn.states[self.state]
 
         if not self.current_token:
             return False
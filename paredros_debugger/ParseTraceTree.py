@@ -2,8 +2,25 @@
 from paredros_debugger.ParseStep import ParseStep
 from paredros_debugger.ParseTraversal import ParseTraversal
 import json
+import sys
 from typing import List, Optional
 
+
+def _walk(root: "ParseTreeNode"):
+    """Yield `root` and all its descendants depth first (children in reverse order)."""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children)
+
+def _walk_breadth_first(root: "ParseTreeNode"):
+    """Yield `root` and all its descendants level by level, in the same order as a BFS."""
+    level = [root]
+    while level:
+        yield from level
+        level = [child for node in level for child in node.children]
+
 class ParseTreeNode:
     """
     Either:
@@ -15,10 +32,13 @@ class ParseTreeNode:
      - a unique id to reference in the UI
     """
 
+    __slots__ = ("rule_name", "token", "children", "trace_steps", "id")
+
     _global_id_counter = 0
 
     def __init__(self, ruleName: Optional[str] = None, token: Optional[str] = None):
-        self.rule_name = ruleName
+        # Rule names repeat across many nodes, share a single string object per name
+        self.rule_name = sys.intern(ruleName) if ruleName else ruleName
         self.token = token
         self.children: List["ParseTreeNode"] = []
         self.trace_steps: List[ParseStep] = []  # list of 'ParseStep' references or copies
@@ -28,21 +48,30 @@ class ParseTreeNode:
         ParseTreeNode._global_id_counter += 1
 
     def to_dict(self, verbose = False) -> dict:
-        node_type = "token" if self.token else "rule"
-        # if we find a faster way, maybe this information could be useful in the front end as well
-        trace_info = []
-        if verbose:
-            for step in self.trace_steps:
-                trace_info.append(step.to_dict())
-
-        return {
-            "id": self.id,
-            "node_type": node_type,
-            "rule_name": self.rule_name,
-            "token": self.token,
-            "trace_info": trace_info if verbose else "collapsed",
-            "children": [child.to_dict(verbose) for child in self.children],
-        }
+        # Built with an explicit stack, deep parse trees would exceed the recursion limit otherwise.
+        # Each entry is a node and the (parent's) children list its dict is appended to.
+        result = None
+        stack = [(self, None)]
+        while stack:
+            node, siblings = stack.pop()
+            # if we find a faster way, maybe this information could be useful in the front end as well
+            trace_info = [step.to_dict() for step in node.trace_steps] if verbose else "collapsed"
+            children = []
+            node_dict = {
+                "id": node.id,
+                "node_type": "token" if node.token else "rule",
+                "rule_name": node.rule_name,
+                "token": node.token,
+                "trace_info": trace_info,
+                "children": children,
+            }
+            if siblings is None:
+                result = node_dict
+            else:
+                siblings.append(node_dict)
+            # reversed, so the first child is popped (and appended) first
+            stack.extend((child, children) for child in reversed(node.children))
+        return result
     
 
 
@@ -65,6 +94,15 @@ class ParseTraceTree:
         # for direct reference of steps by their id
         self.node_id_to_tree_node = {}
 
+        # step id -> (step, owning node), id(node) -> parent node and
+        # id(node) -> highest step id in its subtree, built lazily by _build_step_index
+        self._step_index: Optional[dict] = None
+        self._node_parent: Optional[dict] = None
+        self._subtree_max: Optional[dict] = None
+
+        # memoized result of last_step_id()
+        self._last_step_id: Optional[int] = None
+
     def build_from_traversal(self, traversal: ParseTraversal):
         """
         Read 'traversal.all_steps' in order, building a grammar-based parse tree
@@ -75,6 +113,10 @@ class ParseTraceTree:
             return
 
         self._traversal = traversal
+        self._step_index = None
+        self._node_parent = None
+        self._subtree_max = None
+        self._last_step_id = None
         stack: List[ParseTreeNode] = []
 
         for pnode in traversal.all_steps:
@@ -123,28 +165,45 @@ class ParseTraceTree:
                 # If there's no rule open, we might ignore or handle differently
                 self.node_id_to_tree_node[str(pnode.id)] = stack[-1] if stack else None
 
-    def copy_and_cut(self, max_step_id: int) -> "ParseTraceTree":
+    def copy_and_cut(self, max_step_id: int) -> tuple["ParseTraceTree", int]:
         """
         Produce a *new* ParseTraceTree that includes only those parse steps (and child nodes)
         whose step-IDs are <= `max_step_id`. Steps (and thus entire sub-nodes) with higher IDs
         are pruned out.
 
+        Only the nodes on the cut boundary are copied. Subtrees that lie completely below
+        the cut are shared with this tree, so the result must not be mutated in place
+        without copying the affected nodes first (see contains()).
+
         Returns:
-            ParseTraceTree: a freshly built partial copy.
+            tuple: (ParseTraceTree, int) a freshly built partial copy and the highest
+                step ID it contains (0 if it is empty).
         """
         if not self.root:
-            return ParseTraceTree()
+            return ParseTraceTree(), 0
+        if self._subtree_max is None:
+            self._build_step_index()
 
         # We’ll do a DFS from self.root, creating a parallel tree of ParseTreeNodes.
         new_tree = ParseTraceTree()
+        max_kept_id = 0
+        subtree_max = self._subtree_max
 
         def clone_node(old_node: ParseTreeNode) -> ParseTreeNode:
+            nonlocal max_kept_id
+            # Share subtrees that are completely part of the cut
+            old_max = subtree_max[id(old_node)]
+            if old_max <= max_step_id:
+                max_kept_id = max(max_kept_id, old_max)
+                return old_node
+
             # Filter out trace steps that have id <= max_step_id
             filtered_steps = [st for st in old_node.trace_steps if st.id <= max_step_id]
 
             # If no steps remain, we skip this node entirely.
             if not filtered_steps:
                 return None
+            max_kept_id = max(max_kept_id, max(st.id for st in filtered_steps))
 
             # Create a new node with the same top-level fields (minus the children).
             new_node = ParseTreeNode(ruleName=old_node.rule_name, token=old_node.token)
@@ -166,7 +225,53 @@ class ParseTraceTree:
         # Build the new root
         new_root = clone_node(self.root)
         new_tree.root = new_root
-        return new_tree
+        return new_tree, max_kept_id
+
+    def _build_step_index(self):
+        """Map every step id to its (step, owning node) and every node to its parent."""
+        self._step_index = {}
+        self._node_parent = {}
+        self._subtree_max = {}
+        if not self.root:
+            return
+        nodes = list(_walk(self.root))
+        for node in nodes:
+            for st in node.trace_steps:
+                self._step_index.setdefault(st.id, (st, node))
+            for child in node.children:
+                self._node_parent[id(child)] = node
+
+        # Children come after their parent in `nodes`, so walk it backwards.
+        # Nodes without steps never count as complete (copy_and_cut drops them).
+        for node in reversed(nodes):
+            subtree_max = max((st.id for st in node.trace_steps), default=float("inf"))
+            for child in node.children:
+                subtree_max = max(subtree_max, self._subtree_max[id(child)])
+            self._subtree_max[id(node)] = subtree_max
+
+    def iter_nodes_with_id_between(self, lo: int, hi: int):
+        """
+        Yield (step, node) pairs for the steps with lo < step.id <= hi, in id order.
+        The nodes are references into this tree, not copies.
+        """
+        if self._step_index is None:
+            self._build_step_index()
+        for step_id in range(lo + 1, hi + 1):
+            entry = self._step_index.get(step_id)
+            if entry is not None:
+                yield entry
+
+    def contains(self, node: ParseTreeNode) -> bool:
+        """Return True if `node` is one of this tree's own nodes (and not a copy)."""
+        if self._node_parent is None:
+            self._build_step_index()
+        return node is self.root or id(node) in self._node_parent
+
+    def get_parent(self, node: ParseTreeNode) -> Optional[ParseTreeNode]:
+        """Return the parent of `node` in this tree, or None for the root."""
+        if self._node_parent is None:
+            self._build_step_index()
+        return self._node_parent.get(id(node))
 
     def get_all_decision_steps(self, decision_types=None):
         """
@@ -192,11 +297,8 @@ class ParseTraceTree:
         if not self.root:
             return results
 
-        # Simple BFS or DFS to visit all parse-tree nodes
-        queue = [self.root]
-        while queue:
-            ptnode = queue.pop(0)
-
+        # Simple BFS to visit all parse-tree nodes
+        for ptnode in _walk_breadth_first(self.root):
             # Check each parse-step in this node
             for step in ptnode.trace_steps:
                 if step.node_type in decision_types:
@@ -211,9 +313,6 @@ class ParseTraceTree:
                     }
                     results.append(item)
 
-            # Enqueue children
-            queue.extend(ptnode.children)
-
         return results
     
     def get_decision_step_by_id(self, step_id: str, decision_types=None):
@@ -227,9 +326,7 @@ class ParseTraceTree:
         if not self.root:
             return None
 
-        queue = [self.root]
-        while queue:
-            ptnode = queue.pop(0)
+        for ptnode in _walk_breadth_first(self.root):
             for step in ptnode.trace_steps:
                 if str(step.id) == step_id and step.node_type in decision_types:
                     return {
@@ -240,7 +337,6 @@ class ParseTraceTree:
                         "ruleName": ptnode.rule_name,
                         "token": ptnode.token,
                     }
-            queue.extend(ptnode.children)
 
         return None
     
@@ -255,13 +351,10 @@ class ParseTraceTree:
         if not self.root:
             return None, None
 
-        queue = [self.root]
-        while queue:
-            ptnode = queue.pop(0)
+        for ptnode in _walk_breadth_first(self.root):
             for step in ptnode.trace_steps:
                 if str(step.id) == step_id and step.node_type in decision_types:
                     return (ptnode, step)  # direct references
-            queue.extend(ptnode.children)
 
         return None, None
 
@@ -277,8 +370,10 @@ class ParseTraceTree:
         return json.dumps(d, indent=indent, ensure_ascii=False)
     
     def last_step_id(self) -> int:
-        """Return the highest step ID in the parse tree."""
+        """Return the highest step ID in the parse tree (computed once, the steps do not change)."""
         if not self.root:
             return 0
-        return max(st.id for st in self._traversal.all_steps)
+        if self._last_step_id is None:
+            self._last_step_id = max(st.id for st in self._traversal.all_steps)
+        return self._last_step_id
 
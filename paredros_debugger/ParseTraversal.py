@@ -17,13 +17,41 @@ Key operations:
 - Merging duplicate decision sequences
 - Managing node relationships and IDs
 """
-from antlr4 import Parser, ParserRuleContext, Token
-from antlr4.atn.Transition import AtomTransition, SetTransition, RuleTransition
+import sys
+from typing import Iterable
+
+from antlr4 import Parser, Token
+from antlr4.atn.Transition import AtomTransition, SetTransition, NotSetTransition, RuleTransition
 from antlr4.atn.ATNState import ATNState
 
 from paredros_debugger.ParseStep import ParseStep
 from paredros_debugger.utils import copy_token_stream
 
+
+# Handlers for the token-producing transition types used by follow_transitions.
+# Each one returns the tokens of the transition as a tuple, or None to skip it.
+def _handle_atom(transition, symbolic_names, recognizer):
+    label = transition.label_
+    # Convert label to its symbolicName
+    symbolic = symbolic_names[label] if label < len(symbolic_names) else None
+    return (symbolic,) if symbolic else None
+
+def _handle_set(transition, symbolic_names, recognizer):
+    return tuple(symbolic_names[t] for t in transition.label if t < len(symbolic_names))
+
+def _handle_rule(transition, symbolic_names, recognizer):
+    rule_index = transition.ruleIndex
+    rule_name = recognizer.ruleNames[rule_index] if rule_index < len(recognizer.ruleNames) else "unknown"
+    return (f"Rule {rule_name}",)
+
+# Dispatch on the exact transition type, every other type is followed like an epsilon transition
+_HANDLERS = {
+    AtomTransition: _handle_atom,
+    SetTransition: _handle_set,
+    NotSetTransition: _handle_set,
+    RuleTransition: _handle_rule,
+}
+
 class ParseTraversal:
     def __init__(self):
         """
@@ -34,16 +62,49 @@ class ParseTraversal:
             current_node (ParseNode): Most recently added node
             all_steps (list): Sequential list of all nodes in main path
             parser (Parser): Reference to parser instance for ATN access
+            _decision_memo (dict): Alternative descriptions keyed by step signature
+            _rule_index (dict): Rule name -> rule index of the parser
+            _rule_entry (list): Rule index -> first ATN state inside the rule
+            _symbolic_names (list): Interned copy of the parser's symbolic token names
+            _token_texts (tuple): Token list of the last seen stream and its token texts (None for EOF)
         """
         self.root: ParseStep = None
         self.current_node: ParseStep = None
         self.all_steps : list[ParseStep] = []
         self.parser = None
+        self._decision_memo: dict[tuple, list[tuple[str, bool]]] = {}
+        self._rule_index: dict[str, int] = {}
+        self._rule_entry: list[ATNState] = []
+        self._symbolic_names: list[str] = []
+        self._token_texts: tuple[list, list] = (None, [])
 
 
     def set_parser(self, parser):
-        """Set the parser instance"""
+        """
+        Set the parser instance and precompute the entry point of every rule.
+        The ATN never changes during a parse, so the rule start states and
+        their first transition targets only have to be resolved once.
+
+        The symbolic token names are interned, since they end up in the
+        transition tuples of nearly every node and are compared and hashed
+        over and over while merging and matching tokens.
+        """
         self.parser = parser
+        self.reset_decision_memo()
+
+        self._rule_index = {name: i for i, name in enumerate(parser.ruleNames)}
+        self._rule_entry = [
+            start.transitions[0].target if start.transitions else start
+            for start in parser.atn.ruleToStartState
+        ]
+        self._symbolic_names = [
+            sys.intern(name) if isinstance(name, str) else name
+            for name in parser.symbolicNames
+        ]
+
+    def reset_decision_memo(self):
+        """Forget all memoized alternatives, e.g. when the parser is restarted"""
+        self._decision_memo.clear()
 
     def follow_transitions(self, state, recognizer = None, visited=None):
         """
@@ -57,13 +118,15 @@ class ParseTraversal:
         Args:
             state (ATNState): The current ATN state.
             recognizer (Parser): The parser instance.
-            visited (set): A set of visited states to avoid infinite recursion.
+            visited (set): The states on the current path, used to avoid infinite recursion.
+                States are added on entry and removed again on return (backtracking).
 
         Returns:
-            list: A list of possible transitions, e.g. [(stateNumber, [tokens])]
+            list: A list of possible transitions, e.g. [(stateNumber, (tokens,))]
         """
         if not recognizer:
             recognizer = self.parser
+        symbolic_names = self._symbolic_names if recognizer is self.parser else recognizer.symbolicNames
 
         if visited is None:
             visited = set()
@@ -77,44 +140,25 @@ class ParseTraversal:
 
         # If this is a rule-stop state, return 'Exit'
         if state.stateType == ATNState.RULE_STOP:
-            results.append((state.stateNumber, ["Exit"]))
+            results.append((state.stateNumber, ("Exit",)))
+            visited.discard(state.stateNumber)
             return results
 
         for transition in state.transitions:
-            path_visited = visited.copy()
-            tokens = []
-            next_state = state.stateNumber
-
-            # -- AtomTransition => single token
-            if isinstance(transition, AtomTransition):
-                label = transition.label_
-                # Convert label to its symbolicName
-                symbolic = recognizer.symbolicNames[label] if label < len(recognizer.symbolicNames) else None
-                if symbolic:
-                    results.append((next_state, symbolic))
-                continue
-
-            # -- SetTransition => multiple tokens
-            elif isinstance(transition, SetTransition):
-                set_tokens = []
-                for t in transition.label:
-                    if t < len(recognizer.symbolicNames):
-                        set_tokens.append(recognizer.symbolicNames[t])
-                results.append((next_state, set_tokens))
-                continue
-
-            # -- RuleTransition => calls sub-rule
-            elif isinstance(transition, RuleTransition):
-                rule_index = transition.ruleIndex
-                rule_name = recognizer.ruleNames[rule_index] if rule_index < len(recognizer.ruleNames) else "unknown"
-                results.append((next_state, [f"Rule {rule_name}"]))
+            # Atom => single token, Set => multiple tokens, Rule => calls sub-rule
+            handler = _HANDLERS.get(type(transition))
+            if handler is not None:
+                tokens = handler(transition, symbolic_names, recognizer)
+                if tokens is not None:
+                    results.append((state.stateNumber, tokens))
                 continue
 
             # Epsilon transitions => keep searching
-            if not tokens:
-                next_results = self.follow_transitions(transition.target, recognizer, path_visited)
-                if next_results:
-                    results.extend(next_results)
+            next_results = self.follow_transitions(transition.target, recognizer, visited)
+            if next_results:
+                results.extend(next_results)
+
+        visited.discard(state.stateNumber)
 
         return results
 
@@ -128,7 +172,7 @@ class ParseTraversal:
             visited_rules: (set) For recursion avoidance, if needed.
 
         Returns:
-            A list of (stateNumber, [TOKENS...]) with no 'Rule ...' placeholders left.
+            A list of (stateNumber, (TOKENS...)) with no 'Rule ...' placeholders left.
         """
         if recognizer is None:
             recognizer = self.parser
@@ -137,7 +181,7 @@ class ParseTraversal:
 
         # Step 1: get the first-level transitions
         initial = self.follow_transitions(start_state, recognizer=recognizer)
-        # e.g. [(12, ['Rule expr']), (13, ['INT']), (14, ['Exit'])...]
+        # e.g. [(12, ('Rule expr',)), (13, ('INT',)), (14, ('Exit',))...]
 
         expanded = []
         queue = list(initial)
@@ -147,7 +191,7 @@ class ParseTraversal:
 
             # Partition this item’s tokens into real tokens vs. 'Rule X' placeholders
             rule_names = [t for t in tokens if t.startswith("Rule ")]
-            pure_tokens = [t for t in tokens if not t.startswith("Rule ")]
+            pure_tokens = tuple(t for t in tokens if not t.startswith("Rule "))
 
             # If no rule placeholders, we can finalize this item
             if not rule_names:
@@ -169,12 +213,18 @@ class ParseTraversal:
                 visited_rules.add(rule_name)
 
                 # Find the rule index => rule start state => gather subresults
-                if rule_name in recognizer.ruleNames:
+                if recognizer is self.parser:
+                    rule_idx = self._rule_index.get(rule_name)
+                    rule_start = self._rule_entry[rule_idx] if rule_idx is not None else None
+                elif rule_name in recognizer.ruleNames:
                     rule_idx = recognizer.ruleNames.index(rule_name)
                     rule_start = recognizer.atn.ruleToStartState[rule_idx]
+                else:
+                    rule_start = None
 
+                if rule_start is not None:
                     subres = self.follow_path_to_tokens(rule_start, recognizer, visited_rules)
-                    # subres is also [(stateNum, [tokens])]
+                    # subres is also [(stateNum, (tokens,))]
                     # Add them to the queue to further expand
                     queue.extend(subres)
 
@@ -197,6 +247,7 @@ class ParseTraversal:
             input_text: Current input with cursor position showing progress
             current_rule: Name of the current grammar rule
             node_type: Type of node (Decision, Sync, Rule entry/exit, Token consume)
+            token_stream: Copy of the token stream at this point of the parse
 
         Returns:
             ParseNode: Either a new node or the updated existing node
@@ -206,6 +257,9 @@ class ParseTraversal:
             - Handles duplicate nodes from adaptivePredict and sync calls
             - Maintains the graph structure by linking nodes appropriately
             - Root node is set to first created node
+            - The rule name and token mismatch of each alternative are memoized by
+              (state, token, stream position, rule, node type, target states), since adaptivePredict
+              and sync regularly report the same state at the same input position
         """
     
 
@@ -221,11 +275,20 @@ class ParseTraversal:
             self.current_node = new_node
 
         if possible_transitions:
+            # The memoized entries are per alternative, so the alternatives' target states are part of the key
+            target_states = tuple(target_state for target_state, _ in possible_transitions)
+            signature = (new_node.state, current_token, token_stream.index, current_rule, node_type, target_states)
+            memoized = self._decision_memo.get(signature)
+            alternatives = []
+
             for alt_num, (target_state, _) in enumerate(possible_transitions):
 
-                state = self.parser._interp.atn.states[target_state]
-                rule_index = state.ruleIndex if hasattr(state, "ruleIndex") else -1
-                rule_name = self.parser.ruleNames[rule_index] if rule_index >= 0 else "unknown"
+                if memoized is None:
+                    target = self.parser._interp.atn.states[target_state]
+                    rule_index = target.ruleIndex if hasattr(target, "ruleIndex") else -1
+                    rule_name = self.parser.ruleNames[rule_index] if rule_index >= 0 else "unknown"
+                else:
+                    rule_name, matching_error = memoized[alt_num]
 
                 alt_node = ParseStep(
                     target_state,
@@ -237,9 +300,15 @@ class ParseTraversal:
                     node_type,
                     token_stream
                 )
-                alt_node.matching_error = alt_node.has_token_mismatch(self.parser)
+                if memoized is None:
+                    matching_error = alt_node.has_token_mismatch(self.parser)
+                    alternatives.append((rule_name, matching_error))
+                alt_node.matching_error = matching_error
                 new_node.add_alternative_node(alt_node)
-        
+
+            if memoized is None:
+                self._decision_memo[signature] = alternatives
+
         new_node.matching_error = new_node.has_token_mismatch(self.parser)
 
         return new_node
@@ -270,7 +339,7 @@ class ParseTraversal:
 
         # Create child nodes for each possible transition
         if possible_transitions:
-            for new_target_state, token in possible_transitions:
+            for new_target_state, tokens in possible_transitions:
 
                 state = self.parser._interp.atn.states[new_target_state]
                 rule_index = state.ruleIndex if hasattr(state, "ruleIndex") else -1
@@ -288,8 +357,8 @@ class ParseTraversal:
                 )
 
                 # The next possible transition is a symbolic token --> model consumption
-                if token in self.parser.symbolicNames:
-                    self._update_token_info_after_consume(child_node, token)
+                if len(tokens) == 1 and tokens[0] in self._symbolic_names:
+                    self._update_token_info_after_consume(child_node, tokens[0])
 
                 alt_node.add_alternative_node(child_node)
 
@@ -349,7 +418,7 @@ class ParseTraversal:
 
         elif node_type == "Rule exit":
             node.current_token = f"Rule exit: {rule_name}"
-            node.possible_transitions = [(00, ['Exit'])]
+            node.possible_transitions = [(00, ('Exit',))]
             node.chosen_transition_index = 1
             self.current_node = node
 
@@ -416,11 +485,8 @@ class ParseTraversal:
         Returns:
             str: A string representation of the consumed tokens
         """
-        tokens = []
-        for i in range(input.index):
-            token = input.get(i)
-            if token.type != Token.EOF:
-                tokens.append(token.text)
+        texts = self._get_token_texts(input)
+        tokens = [text for text in texts[:input.index] if text is not None]
 
         lookahead = []
         for i in range(1, lookahead_depth + 1):
@@ -435,6 +501,28 @@ class ParseTraversal:
 
         return consumed
 
+    def _get_token_texts(self, input):
+        """
+        Get the texts of all tokens fetched so far from the stream, with None for EOF.
+
+        The texts are kept in a column next to the stream's token list and only
+        the tokens added since the last call are read.
+
+        Args:
+            input (TokenStream): The token stream.
+
+        Returns:
+            list: Token texts, indexed like the stream's tokens
+        """
+        tokens, texts = self._token_texts
+        if tokens is not input.tokens:
+            tokens, texts = input.tokens, []
+            self._token_texts = (tokens, texts)
+        for i in range(len(texts), len(tokens)):
+            token = tokens[i]
+            texts.append(None if token.type == Token.EOF else token.text)
+        return texts
+
     def get_node_by_id(self, node_id) -> ParseStep :
         """Find a node by its unique identifier
 
@@ -444,25 +532,16 @@ class ParseTraversal:
         Returns:
             ParseNode: The node with matching ID, or None if not found
         """
-        def search_node(node: ParseStep):
-            if str(node.id) == str(node_id):
+        target = str(node_id)
+        # Walk the main path, checking each node and its alternatives
+        node = self.root
+        while node:
+            if str(node.id) == target:
                 return node
-
-            # Search alternative nodes
             for alt in node.alternative_branches:
-                if str(alt.id) == str(node_id):
+                if str(alt.id) == target:
                     return alt
-
-            # Search next node in chain
-            if node.next_node:
-                result = search_node(node.next_node)
-                if result:
-                    return result
-
-            return None
-
-        if self.root:
-            return search_node(self.root)
+            node = node.next_node
         return None
 
     # Methods for updating the Datastructure based on the type of node that was added
@@ -534,7 +613,7 @@ class ParseTraversal:
         node.token_stream.consume()
         if node.token_stream.index < len(node.token_stream.tokens):
             next_token = node.token_stream.tokens[node.token_stream.index]
-            node.current_token = self.parser.symbolicNames[next_token.type]
+            node.current_token = self._symbolic_names[next_token.type]
             
             # Update input context and lookahead
             node.input_text = self._get_consumed_tokens(node.token_stream, 3)
@@ -543,7 +622,7 @@ class ParseTraversal:
             # Set next token information
             upcoming_token = node.token_stream.LT(1)
             if upcoming_token:
-                node.next_input_token = self.parser.symbolicNames[upcoming_token.type]
+                node.next_input_token = self._symbolic_names[upcoming_token.type]
                 node.next_input_literal = upcoming_token.text
             else:
                 node.next_input_token = None
@@ -565,17 +644,34 @@ class ParseTraversal:
             - Ignores single nodes (no merge needed)
             - Preserves rule entry/exit and token consume nodes
         """
-        # List to store groups of nodes that should be cleaned up
-        cleanup_groups: list[list[ParseStep]] = []
+        return list(self._iter_merged_groups())
+
+    def merge_and_replace(self):
+        """
+        Merges duplicate decision/sync nodes and replaces them in the traversal in one go.
+
+        Feeds the groups from _iter_merged_groups straight into replace_merged_nodes,
+        so the intermediate list of groups is never built.
+        """
+        self.replace_merged_nodes(self._iter_merged_groups())
+
+    def _iter_merged_groups(self):
+        """
+        Walks all_steps once and yields a (group, merged_node) tuple as soon as a
+        group of consecutive decision/sync nodes of the same rule is closed.
+
+        Yields:
+            tuple: (original_nodes, merged_node) for each group with more than one node
+        """
         current_group: list[ParseStep] = []
         current_rule = None
 
         for node in self.all_steps:
             # Skip nodes we don't want to modify
             if node.node_type in ['Rule entry', 'Rule exit', 'Token consume']:
-                # If we have a pending group, add it to cleanup_groups
+                # If we have a pending group, merge it
                 if len(current_group) > 1:
-                    cleanup_groups.append(current_group)
+                    yield current_group, self._merge_group(current_group)
 
                 current_group = []
                 current_rule = None    
@@ -592,116 +688,117 @@ class ParseTraversal:
                     current_group.append(node)
                 # If this node starts a new group
                 else:
-                    if len(current_group) > 1:  # Only add groups with multiple nodes
-                        cleanup_groups.append(current_group)
+                    if len(current_group) > 1:  # Only merge groups with multiple nodes
+                        yield current_group, self._merge_group(current_group)
                     current_group = [node]
                     current_rule = node.rule_name
 
         # Handle last group if exists
         if current_group and len(current_group) > 1:
-            cleanup_groups.append(current_group)
-
-        # Process each group and create merged nodes
-        merged_nodes = []
-        for group in cleanup_groups:
-            # Get all unique alternatives from all nodes in group
-            all_alternatives = set()
-            for node in group:
-                for target_state, matches in node.possible_transitions:
-                    all_alternatives.add((target_state, tuple(matches)))  # Convert list to tuple for set
-
-            # Same logic as above but for alternative nodes
-            seen_alt_nodes = set()
-            all_alt_nodes = []
-            for node in group:
-                for alt_node in node.alternative_branches:
-                    # Use state as identifier since we dont need the same state twice
-                    if alt_node.state not in seen_alt_nodes:
-                        seen_alt_nodes.add(alt_node.state)
-                        all_alt_nodes.append(alt_node)
-
-
-            all_alternatives = sorted(list(all_alternatives))
-            last_chosen = group[-1].chosen_transition_index
-
-            # If the last node had a chosen alternative, find its equivalent in merged alternatives
-            # The last node always has a chosen alternative due to how we build our datastructure (we still double check for safety)
-            new_chosen = -1
-            if last_chosen > 0:
-                last_node = group[-1]
-                target_state, matches = last_node.possible_transitions[last_chosen - 1]
-                # Find matching alternative in merged set
-                for i, (merged_state, merged_matches) in enumerate(all_alternatives):
-                    if merged_state == target_state and tuple(matches) == merged_matches:
-                        new_chosen = i + 1
-                        break
+            yield current_group, self._merge_group(current_group)
 
-            # Create merged node
-            merged_node = ParseStep(
-                atn_state=group[0].state, 
-                current_token=group[-1].current_token,  
-                lookahead=group[-1].lookahead,  
-                possible_transitions=all_alternatives,  
-                input_text=group[-1].input_text,  
-                rule=group[0].rule_name,  
-                node_type="Merged " + group[0].node_type,
-                token_stream=group[0].token_stream,
-                previous_id=group[0].id - 1  
-            )
+    def _merge_group(self, group: list[ParseStep]) -> ParseStep:
+        """
+        Creates a single merged node from a group of consecutive decision/sync nodes.
 
-            merged_node.id = group[0].id  # Use first node's ID
-            merged_node.is_error_node = any(n.is_error_node for n in group)  # Mark as error if any node has error
-            merged_node.alternative_branches = all_alt_nodes  # Use all alternative nodes
-            merged_node.chosen_transition_index = new_chosen
-            merged_nodes.append((group, merged_node))
+        Args:
+            group (list[ParseStep]): The nodes to merge, in traversal order
 
-        return merged_nodes
+        Returns:
+            ParseStep: The merged node carrying the union of the group's alternatives
+        """
+        # Get all unique alternatives from all nodes in group
+        all_alternatives = set()
+        for node in group:
+            for target_state, matches in node.possible_transitions:
+                all_alternatives.add((target_state, matches))
+
+        # Same logic as above but for alternative nodes
+        seen_alt_nodes = set()
+        all_alt_nodes = []
+        for node in group:
+            for alt_node in node.alternative_branches:
+                # Use state as identifier since we dont need the same state twice
+                if alt_node.state not in seen_alt_nodes:
+                    seen_alt_nodes.add(alt_node.state)
+                    all_alt_nodes.append(alt_node)
+
+
+        all_alternatives = sorted(list(all_alternatives))
+        last_chosen = group[-1].chosen_transition_index
+
+        # If the last node had a chosen alternative, find its equivalent in merged alternatives
+        # The last node always has a chosen alternative due to how we build our datastructure (we still double check for safety)
+        new_chosen = -1
+        if last_chosen > 0:
+            last_node = group[-1]
+            target_state, matches = last_node.possible_transitions[last_chosen - 1]
+            # Find matching alternative in merged set
+            for i, (merged_state, merged_matches) in enumerate(all_alternatives):
+                if merged_state == target_state and matches == merged_matches:
+                    new_chosen = i + 1
+                    break
+
+        # Create merged node
+        merged_node = ParseStep(
+            atn_state=group[0].state, 
+            current_token=group[-1].current_token,  
+            lookahead=group[-1].lookahead,  
+            possible_transitions=all_alternatives,  
+            input_text=group[-1].input_text,  
+            rule=group[0].rule_name,  
+            node_type="Merged " + group[0].node_type,
+            token_stream=group[0].token_stream,
+            previous_id=group[0].id - 1  
+        )
+
+        merged_node.id = group[0].id  # Use first node's ID
+        merged_node.is_error_node = any(n.is_error_node for n in group)  # Mark as error if any node has error
+        merged_node.alternative_branches = all_alt_nodes  # Use all alternative nodes
+        merged_node.chosen_transition_index = new_chosen
+        return merged_node
 
 
-    def replace_merged_nodes(self, merged_groups: list[tuple[list[ParseStep], ParseStep]]):
+    def replace_merged_nodes(self, merged_groups: Iterable[tuple[list[ParseStep], ParseStep]]):
         """
         Replaces groups of nodes with their merged versions and fixes the node structure.
+        Accepts the list from group_and_merge or the generator from _iter_merged_groups.
+
+        The groups are produced in traversal order, so all_steps is rebuilt in a single
+        pass: each group is looked up by the id of its first node, and the next/previous
+        links are rewired while the new step list is emitted.
         """
+        # id(first node of group) -> (ids of all group members, group, merged node)
+        group_starts: dict[int, tuple[set, list[ParseStep], ParseStep]] = {}
+        for group, merged_node in merged_groups:
+            group_starts[id(group[0])] = ({id(node) for node in group}, group, merged_node)
+
         new_nodes = []
-        current_pos = 0
+        active_group = None
 
-        for group, merged_node in merged_groups:
-            # Add all nodes before the group
-            while current_pos < len(self.all_steps):
-                node = self.all_steps[current_pos]
-                if node in group:
-                    break
-                new_nodes.append(node)
-                current_pos += 1
+        for node in self.all_steps:
+            # Skip the remaining members of the group that was just merged
+            if active_group is not None:
+                if id(node) in active_group:
+                    continue
+                active_group = None
+
+            group_entry = group_starts.get(id(node))
+            if group_entry is not None:
+                active_group, group, merged_node = group_entry
+
+                # Transfer alternative nodes and their relationships
+                merged_node.alternative_branches = group[-1].alternative_branches
+                for alt_node in merged_node.alternative_branches:
+                    alt_node.previous_node = merged_node
+                node = merged_node
 
-            # Add merged node and update connections
-            new_nodes.append(merged_node)
-            
             # Connect to previous node
-            if len(new_nodes) > 1:
-                prev_node = new_nodes[-2]
-                prev_node.next_node = merged_node
-                merged_node.previous_node = prev_node
-
-            # Skip nodes in group
-            while current_pos < len(self.all_steps) and self.all_steps[current_pos] in group:
-                current_pos += 1
-
-            # Connect to next node after group
-            if current_pos < len(self.all_steps):
-                next_node = self.all_steps[current_pos]
-                merged_node.next_node = next_node
-                next_node.previous_node = merged_node
-
-            # Transfer alternative nodes and their relationships
-            merged_node.alternative_branches = group[-1].alternative_branches
-            for alt_node in merged_node.alternative_branches:
-                alt_node.previous_node = merged_node
-
-        # Add remaining nodes
-        while current_pos < len(self.all_steps):
-            new_nodes.append(self.all_steps[current_pos])
-            current_pos += 1
+            if new_nodes:
+                prev_node = new_nodes[-1]
+                prev_node.next_node = node
+                node.previous_node = prev_node
+            new_nodes.append(node)
 
         self.all_steps = new_nodes
         
@@ -722,13 +819,9 @@ class ParseTraversal:
             node.id = next_id
             next_id += 1
 
-        # Fix IDs of alternative nodes for each node
-        def update_alt(node: ParseStep):
+        # Fix IDs of alternative nodes for each node along the main path
+        node = self.root
+        while node:
             for i, alt in enumerate(node.alternative_branches, 1):
                 alt.id = str(node.id) + "." + str(i)
-
-            if node.next_node:
-                update_alt(node.next_node)
-
-        if self.root:
-            update_alt(self.root)
\ No newline at end of file
+            node = node.next_node
\ No newline at end of file
@@ -1,10 +1,13 @@
+from bisect import bisect_left
 from typing import Optional, List
-from collections import deque
 
-from paredros_debugger.ParseTraceTree import ParseTraceTree, ParseTreeNode
+from paredros_debugger.ParseTraceTree import ParseTraceTree, ParseTreeNode, _walk, _walk_breadth_first
 from paredros_debugger.ParseStep import ParseStep
 from paredros_debugger.ParseTraversal import ParseTraversal
 
+class NoMoreAlternatives(RuntimeError):
+    """Raised by expand_alternatives if the current step has nothing to expand."""
+
 class ParseTreeExplorer:
     """
     A parse explorer that maintains:
@@ -43,10 +46,31 @@ class ParseTreeExplorer:
 
         self.current_step_id = start_id
 
+        # Sorted ids of the original steps the decision stepping has to stop at:
+        # decisions (multiple possible_transitions) and, when stepping forward,
+        # uncommitted steps as well, since those are expanded instead of cut to
+        self._decision_ids: List[int] = sorted(
+            step.id for step in self._all_steps if step.num_alternatives > 1
+        )
+        self._forward_stop_ids: List[int] = sorted(
+            step.id for step in self._all_steps
+            if step.num_alternatives > 1 or not step.is_committed
+        )
+
+        # step id -> ParseStep / owning ParseTreeNode in the working_tree,
+        # filled by _index_working_tree and kept up to date by the alt expansion methods
+        self._id_to_step: dict[int, ParseStep] = {}
+        self._id_to_ptnode: dict[int, ParseTreeNode] = {}
+        # id(ParseTreeNode) -> its parent in the working_tree
+        self._parent_of: dict[int, ParseTreeNode] = {}
+
         # Build the working_tree as a cut up to 'start_id'
-        self.working_tree = self.original_tree.copy_and_cut(self.current_step_id)
-        # compute max_work_id from the partial parse
-        self.max_work_id = self._compute_max_work_id()
+        # (copy_and_cut also reports the max step id of the partial parse)
+        self.working_tree, self.max_work_id = self.original_tree.copy_and_cut(self.current_step_id)
+        self._index_working_tree()
+        # step_id of the last cut, and whether alt expansions have touched the working_tree since
+        self._cut_id = self.current_step_id
+        self._working_tree_dirty = False
 
         # For alt expansions
         self._in_alternative_expansion_mode = False
@@ -62,30 +86,160 @@ class ParseTreeExplorer:
     def to_dict(self, verbose:bool = False) -> dict:
         return self.working_tree.to_dict(verbose)
 
-    def _compute_max_work_id(self) -> int:
-        """Compute the maximum parse-step ID found in self.working_tree."""
+    def _index_working_tree(self):
+        """
+        BFS over self.working_tree to fill the step id -> ParseStep / ParseTreeNode index
+        and the parent map.
+        """
         if not self.working_tree.root:
-            return 0
-        max_id = 0
-        queue = deque([self.working_tree.root])
-        while queue:
-            node = queue.popleft()
+            return
+        id_to_step = self._id_to_step
+        id_to_ptnode = self._id_to_ptnode
+        parent_of = self._parent_of
+        for node in _walk_breadth_first(self.working_tree.root):
             for st in node.trace_steps:
-                if isinstance(st.id, int) and st.id > max_id:
-                    max_id = st.id
+                # first hit in BFS order wins, like the former BFS lookups
+                if st.id not in id_to_step:
+                    id_to_step[st.id] = st
+                    id_to_ptnode[st.id] = node
             for c in node.children:
-                queue.append(c)
-        return max_id
+                parent_of[id(c)] = node
 
-    def _cut_to_step(self, step_id: int):
+    def _cut_to_step(self, step_id: int, full: bool = False):
         """
-        Rebuild self.working_tree by cutting from the original_tree up to `step_id`.
+        Bring self.working_tree to a cut of the original_tree up to `step_id`.
         Then recalc max_work_id.
+
+        Unless `full` is set, the current cut is grown or shrunk in place by the steps
+        between the two cut points. A full copy is only made when that is not possible,
+        e.g. because alt expansions changed the working_tree.
         """
-        self.working_tree = self.original_tree.copy_and_cut(step_id)
-        self.max_work_id = self._compute_max_work_id()
+        if full or not self._extend_cut_to(step_id):
+            self.working_tree, self.max_work_id = self.original_tree.copy_and_cut(step_id)
+            self._id_to_step.clear()
+            self._id_to_ptnode.clear()
+            self._parent_of.clear()
+            self._index_working_tree()
+            self._working_tree_dirty = False
+        self._cut_id = step_id
         self.current_step_id = self.max_work_id
 
+    def _extend_cut_to(self, step_id: int) -> bool:
+        """
+        Move the current (unmodified) cut to `step_id` by attaching or detaching single steps.
+        Returns False if the working_tree has to be rebuilt with a full copy instead.
+        """
+        if self._working_tree_dirty:
+            return False
+
+        if step_id > self._cut_id:
+            for step, orig_node in self.original_tree.iter_nodes_with_id_between(self._cut_id, step_id):
+                if not self._attach_cut_step(step, orig_node):
+                    return False
+        else:
+            for old_id in range(self._cut_id, step_id, -1):
+                self._detach_cut_step(old_id)
+
+        # the cut keeps every step <= step_id, so the largest one present is the max id
+        max_id = step_id
+        while max_id > 0 and max_id not in self._id_to_step:
+            max_id -= 1
+        self.max_work_id = max_id
+        return True
+
+    def _attach_cut_step(self, step: ParseStep, orig_node: ParseTreeNode) -> bool:
+        """
+        Add one original-tree step to the working_tree, cloning its owning node if it is new.
+        Returns False if the clone's parent is not in the working_tree.
+        """
+        first_id = orig_node.trace_steps[0].id
+        if first_id != step.id:
+            # The owning node is already part of the cut
+            clone = self._id_to_ptnode.get(first_id)
+            if clone is None:
+                return False
+            clone = self._ensure_owned(clone)
+            clone.trace_steps.append(step)
+        else:
+            # First step of this node => it becomes the last child of its parent's clone
+            clone = ParseTreeNode(ruleName=orig_node.rule_name, token=orig_node.token)
+            clone.id = orig_node.id
+            clone.trace_steps = [step]
+            orig_parent = self.original_tree.get_parent(orig_node)
+            if orig_parent is None:
+                if self.working_tree.root is not None:
+                    return False
+                self.working_tree.root = clone
+            else:
+                parent_clone = self._id_to_ptnode.get(orig_parent.trace_steps[0].id)
+                if parent_clone is None:
+                    return False
+                parent_clone = self._ensure_owned(parent_clone)
+                parent_clone.children.append(clone)
+                self._parent_of[id(clone)] = parent_clone
+
+        self._id_to_step[step.id] = step
+        self._id_to_ptnode[step.id] = clone
+        return True
+
+    def _detach_cut_step(self, step_id: int):
+        """Remove one step from the working_tree, dropping its node once it has no steps left."""
+        step = self._id_to_step.get(step_id)
+        if step is None:
+            return
+        node = self._id_to_ptnode[step_id]
+        if len(node.trace_steps) > 1:
+            self._ensure_owned(node).trace_steps.remove(step)
+        else:
+            # Last step of the node => drop the node itself, only its parent is modified
+            parent = self._parent_of.get(id(node))
+            if parent is None:
+                self.working_tree.root = None
+            else:
+                self._ensure_owned(parent).children.remove(node)
+                del self._parent_of[id(node)]
+        del self._id_to_step[step_id]
+        del self._id_to_ptnode[step_id]
+
+    def _ensure_owned(self, node: Optional[ParseTreeNode]) -> Optional[ParseTreeNode]:
+        """
+        Return a working_tree node that can be mutated in place of `node`.
+
+        copy_and_cut shares complete subtrees with the original_tree. Before such a node
+        is changed, it is replaced by a shallow copy, together with its shared ancestors,
+        and the index and parent map are pointed at the copies.
+        """
+        if node is None or not self.original_tree.contains(node):
+            return node
+
+        # Collect the shared nodes from `node` up to the first owned ancestor
+        spine = [node]
+        parent = self._parent_of.get(id(node))
+        while parent is not None and self.original_tree.contains(parent):
+            spine.append(parent)
+            parent = self._parent_of.get(id(parent))
+
+        # Copy them top-down, `parent` is always the owned node to attach to (None => root)
+        for shared in reversed(spine):
+            clone = ParseTreeNode(ruleName=shared.rule_name, token=shared.token)
+            clone.id = shared.id
+            clone.trace_steps = list(shared.trace_steps)
+            clone.children = list(shared.children)
+            if parent is None:
+                self.working_tree.root = clone
+            else:
+                siblings = parent.children
+                siblings[siblings.index(shared)] = clone
+                self._parent_of[id(clone)] = parent
+            self._parent_of.pop(id(shared), None)
+            for child in clone.children:
+                self._parent_of[id(child)] = clone
+            for st in clone.trace_steps:
+                if self._id_to_ptnode.get(st.id) is shared:
+                    self._id_to_ptnode[st.id] = clone
+            parent = clone
+        return parent
+
     @property
     def current_step(self) -> Optional[ParseStep]:
         """Get the current parse step (ParseStep) from the working tree."""
@@ -105,19 +259,22 @@ class ParseTreeExplorer:
         if self._in_alternative_expansion_mode:
             self.cancel_alt_expansion()  
 
+        last_step_id = self.original_tree.last_step_id()
+        # the index dict is only ever cleared and refilled, so it can be bound once
+        id_to_step = self._id_to_step
         for _ in range(num_steps):
             next_id = self.current_step_id + 1
             # runtime error if we try to step further and we are at the end of the input
             # TODO: actually check input isntead of just step IDs
-            if next_id > self.original_tree.last_step_id():
+            if next_id > last_step_id:
                 raise RuntimeError("Cannot step beyond end of input.")
 
             # We are stepping beyond the current partial parse,
             # test if we are on the original path
-            step = self.current_step
+            step = id_to_step.get(self.current_step_id)
             if not step:
                 raise RuntimeError(f"No parse step at ID={self.current_step_id} to expand from.")
-            if step.chosen_transition_index != -1:
+            if step.is_committed:
                 self._cut_to_step(next_id)
                 return
             
@@ -128,9 +285,9 @@ class ParseTreeExplorer:
                     self.choose_alternative(1)
                 # If we have multiple alts we need to pick one
                 # We'll do no further auto stepping here.
-            except:
-                raise RuntimeError(f"No parse step at ID={self.current_step_id} to expand from.")
+            except NoMoreAlternatives as e:
                 # we are already at the last step! (no more alts)
+                raise RuntimeError(f"No parse step at ID={self.current_step_id} to expand from.") from e
 
     def go_back_one_step(self):
         """
@@ -168,7 +325,7 @@ class ParseTreeExplorer:
             raise RuntimeError(f"Step ID={step_id} is beyond the original parse.")
 
         self.current_step_id = step_id
-        self._cut_to_step(step_id)
+        self._cut_to_step(step_id, full=True)
 
     def step_until_next_decision(self):
         """
@@ -178,9 +335,20 @@ class ParseTreeExplorer:
         if self._in_alternative_expansion_mode:
             self.cancel_alt_expansion()
 
+        # On the original path every step up to the next stop id is just a cut,
+        # so jump there directly instead of cutting step by step
+        if self.current_step_id <= self.max_work_id:
+            i = bisect_left(self._forward_stop_ids, self.current_step_id)
+            last_step_id = self.original_tree.last_step_id()
+            target = self._forward_stop_ids[i] if i < len(self._forward_stop_ids) else last_step_id
+            target = min(target, last_step_id)
+            if target > self.current_step_id:
+                self._cut_to_step(target)
+
+        id_to_step = self._id_to_step
         while True:
-            cur_step = self.current_step
-            if cur_step and len(cur_step.possible_transitions) > 1:
+            cur_step = id_to_step.get(self.current_step_id)
+            if cur_step and cur_step.num_alternatives > 1:
                 # already at a decision => break
                 return
             # else step forward by 1
@@ -196,10 +364,18 @@ class ParseTreeExplorer:
         if self._in_alternative_expansion_mode:
             self.cancel_alt_expansion()
 
+        # On the original path, going back is a single cut to the previous decision (or 0)
+        if 0 < self.current_step_id <= self.max_work_id:
+            i = bisect_left(self._decision_ids, self.current_step_id)
+            target = self._decision_ids[i - 1] if i > 0 else 0
+            self._cut_to_step(target)
+            return
+
+        id_to_step = self._id_to_step
         while self.current_step_id > 0:
             self.go_back_one_step()
-            step = self.current_step
-            if step and len(step.possible_transitions) > 1:
+            step = id_to_step.get(self.current_step_id)
+            if step and step.num_alternatives > 1:
                 return
             
     # -------------------------------------------------------------------------
@@ -220,33 +396,40 @@ class ParseTreeExplorer:
         step = self.current_step
         # if len(step.possible_transitions) < 2:
         #    raise RuntimeError("This step does not have multiple alternatives to expand.")
-
-        # Find the parseTreeNode in the working_tree
-        ptnode = self._find_ptnode_in_working(self.current_step_id)
-
-        self._expanded_alt_nodes.clear()
-        self._expanded_alt_ptnodes.clear()
+        if step is None:
+            raise NoMoreAlternatives(f"No parse step at ID={self.current_step_id} to expand from.")
 
         # Get alternatives for each possible choice in possible_transitions
         possible_steps: list[ParseStep] = []
-        for alt_index in range(len(step.possible_transitions)):
+        for alt_index in range(step.num_alternatives):
             # Get the ParseStep for this alternative (alt_index is 0-based, method expects 1-based)
             alt_step = self._traversal.expand_transition(step, alt_index + 1)
             if alt_step:
                 possible_steps.append(alt_step)
-            
+        if not possible_steps:
+            raise NoMoreAlternatives(f"Step ID={self.current_step_id} has no alternatives to expand.")
+
+        # Find the parseTreeNode in the working_tree
+        ptnode = self._ensure_owned(self._find_ptnode_in_working(self.current_step_id))
+
+        self._expanded_alt_nodes.clear()
+        self._expanded_alt_ptnodes.clear()
+        self._working_tree_dirty = True
+
         # Create ParseTreeNodes for each alternative and attach them to the working tree
         for idx, alt_step in enumerate(possible_steps):  
             # Create a new ParseTreeNode for this alternative
             alt_ptnode = ParseTreeNode(ruleName=alt_step.rule_name)
             alt_ptnode.trace_steps.append(alt_step)
                 
-            # Mark this as an alternative node
-            if step.chosen_transition_index and not idx+1 == step.chosen_transition_index:
+            # Mark this as an alternative node (every alternative is one if the parser took none)
+            if not step.is_committed or idx + 1 != step.chosen_transition_index:
                 alt_step.node_type = "alt_node"
             
             # Add this alternative ParseTreeNode as a child of the current ptnode
             ptnode.children.append(alt_ptnode)
+            self._parent_of[id(alt_ptnode)] = ptnode
+            self._index_ptnode(alt_ptnode)
             
             # Store the alternative nodes for later selection
             self._expanded_alt_nodes.append(alt_step)
@@ -279,6 +462,7 @@ class ParseTreeExplorer:
         for i, pt in enumerate(self._expanded_alt_ptnodes):
             if pt is not chosen_pt:
                 self._remove_node_from_parent(self.working_tree.root, pt)
+                self._unindex_ptnode(pt)
 
         # rename the chosen alt node
         chosen_step.node_type = "alt_chosen"
@@ -286,7 +470,9 @@ class ParseTreeExplorer:
         self._expanded_alt_nodes.clear()
         self._expanded_alt_ptnodes.clear()
         self.current_step_id += 1
+        self._unindex_ptnode(chosen_pt)
         chosen_step.id = self.current_step_id
+        self._index_ptnode(chosen_pt)
 
 
     def cancel_alt_expansion(self):
@@ -296,6 +482,7 @@ class ParseTreeExplorer:
 
         for pt in self._expanded_alt_ptnodes:
             self._remove_node_from_parent(self.working_tree.root, pt)
+            self._unindex_ptnode(pt)
 
         self._expanded_alt_nodes.clear()
         self._expanded_alt_ptnodes.clear()
@@ -306,63 +493,66 @@ class ParseTreeExplorer:
     # -------------------------------------------------------------------------
     def _get_working_tree_step(self, step_id: int) -> Optional[ParseStep]:
         """
-        Search the *working tree* for a parse step (ParseStep) whose .id == step_id.
+        Look up the parse step (ParseStep) in the *working tree* whose .id == step_id.
         Returns the matching ParseStep, or None if not found.
         """
-        if not self.working_tree or not self.working_tree.root:
-            return None
-
-        from collections import deque
-        queue = deque([self.working_tree.root])
-
-        while queue:
-            node = queue.popleft()
-            for st in node.trace_steps:
-                if st.id == step_id:
-                    return st
-            for child in node.children:
-                queue.append(child)
-
-        return None
+        return self._id_to_step.get(step_id)
 
     def _find_ptnode_in_working(self, step_id: int) -> Optional[ParseTreeNode]:
-        """BFS in the working_tree to find a node whose trace_steps contains step_id."""
-        if not self.working_tree.root:
-            return None
-        queue = deque([self.working_tree.root])
-        while queue:
-            node = queue.popleft()
-            for st in node.trace_steps:
-                if st.id == step_id:
-                    return node
-            queue.extend(node.children)
-        return None
+        """Look up the working_tree node whose trace_steps contains step_id."""
+        return self._id_to_ptnode.get(step_id)
+
+    def _index_ptnode(self, ptnode: ParseTreeNode):
+        """Add the trace steps of a node attached to the working_tree to the step index."""
+        for st in ptnode.trace_steps:
+            if st.id not in self._id_to_step:
+                self._id_to_step[st.id] = st
+                self._id_to_ptnode[st.id] = ptnode
+
+    def _unindex_ptnode(self, ptnode: ParseTreeNode):
+        """Drop the index entries that point at a node removed from the working_tree."""
+        for st in ptnode.trace_steps:
+            if self._id_to_ptnode.get(st.id) is ptnode:
+                del self._id_to_step[st.id]
+                del self._id_to_ptnode[st.id]
 
     def _remove_node_from_parent(self, root: ParseTreeNode, target: ParseTreeNode) -> bool:
-        """BFS to remove `target` from some node's children in working_tree."""
-        queue = deque([root])
-        while queue:
-            cur = queue.popleft()
-            for ch in list(cur.children):
-                if ch is target:
-                    cur.children.remove(ch)
-                    return True
-                else:
-                    queue.append(ch)
-        return False
+        """
+        Remove `target` from its parent's children in working_tree.
+        Uses the parent map and only falls back to a BFS from `root` if the node is not in it.
+        """
+        parent = self._parent_of.get(id(target))
+        if parent is None or target not in parent.children:
+            parent = next((node for node in self._iter_nodes(root) if target in node.children), None)
+            if parent is None:
+                return False
+        self._ensure_owned(parent).children.remove(target)
+        self._parent_of.pop(id(target), None)
+        return True
 
     def _remove_alt_step(self, step_id: int):
         """
-        BFS in working_tree to remove any parse-tree node whose first trace_step has ID=step_id,
+        Remove the parse-tree node whose first trace_step has ID=step_id from the working_tree,
         presumably an alt node if step_id > max_work_id.
         """
         if not self.working_tree.root:
             return
-        queue = deque([self.working_tree.root])
-        while queue:
-            node = queue.popleft()
-            for child in list(node.children):
+        ptnode = self._id_to_ptnode.get(step_id)
+        if ptnode is not None and ptnode.trace_steps[0].id == step_id:
+            if self._remove_node_from_parent(self.working_tree.root, ptnode):
+                self._unindex_ptnode(ptnode)
+                return
+        for node in self._iter_nodes():
+            for child in node.children:
                 if child.trace_steps and child.trace_steps[0].id == step_id:
-                    node.children.remove(child)
+                    self._ensure_owned(node).children.remove(child)
+                    self._parent_of.pop(id(child), None)
+                    self._unindex_ptnode(child)
                     return
-                queue.append(child)
+
+    def _iter_nodes(self, root: Optional[ParseTreeNode] = None):
+        """Yield all nodes of the working_tree (or below `root`), in no particular order."""
+        if root is None:
+            root = self.working_tree.root
+        if root is not None:
+            yield from _walk(root)
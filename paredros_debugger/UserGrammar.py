@@ -8,22 +8,102 @@ The module provides three main classes:
 - UserGrammar: Manages multiple grammar files and their relationships
 """
 
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+import functools
 import os
 import re
+import sys
+
+# An import statement at the start of a line, e.g. "import CommonLexer;"
+_IMPORT_RE = re.compile(r'^[ \t]*import\s+([^;\n]+);?', re.MULTILINE)
+
+# The start of a rule definition: the (optionally fragment) rule name at the start of a line and
+# anything up to its colon (arguments, returns, ...). The body is scanned by _rule_end.
+# The start of a comment between rules is matched on its own (without a name), the comment is
+# then skipped as a whole, so that rule-like text in a commented out block is not taken for a rule.
+_RULE_RE = re.compile(
+    r"""
+    /\* | //                        # comment outside of a rule
+    |
+    ^[ \t]*(?P<name>(?:fragment[ \t]+)?[A-Za-z_]\w*\b)
+    [^:;'{}\n]*(?:\n\s*)?:          # the colon may follow on a later line
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+
+# The characters that can matter in a rule body, see _rule_end
+_BODY_SPECIAL_RE = re.compile(r"[;{}'\[]|/[/*]")
+_ACTION_SPECIAL_RE = re.compile(r"[{}]")
+# The rest of a string literal and of a character set after their opening quote or bracket
+_STRING_REST_RE = re.compile(r"(?:\\.|[^'\\\n])*'")
+_CHARSET_REST_RE = re.compile(r"(?:\\.|[^\]\\])*\]")
+
+def _rule_end(content: str, pos: int) -> int:
+    """
+    Returns the end of the rule body starting at `pos`, i.e. the index after its terminating
+    semicolon, or the end of the content for a rule that is not terminated.
+    String literals, character sets, comments and (nested) actions are skipped as a whole, so a ';'
+    inside them does not end the rule. An unterminated string literal, character set or block comment
+    counts as ordinary text.
+    """
+    depth = 0
+    while True:
+        match = (_ACTION_SPECIAL_RE if depth else _BODY_SPECIAL_RE).search(content, pos)
+        if match is None:
+            return len(content)
+        special = match.group()
+        pos = match.end()
+        if special == '{':
+            depth += 1
+        elif special == '}':
+            depth = max(depth - 1, 0)
+        elif special == ';':
+            return pos
+        elif special == "'":
+            rest = _STRING_REST_RE.match(content, pos)
+            if rest:
+                pos = rest.end()
+        elif special == '[':
+            rest = _CHARSET_REST_RE.match(content, pos)
+            if rest:
+                pos = rest.end()
+        elif special == '//':
+            pos = content.find('\n', pos)
+            if pos < 0:
+                return len(content)
+        else:  # '/*'
+            comment_end = content.find('*/', pos)
+            pos = comment_end + 2 if comment_end >= 0 else match.start() + 1
+
+# One line with its surrounding whitespace outside of the group, i.e. group(1) == line.strip()
+_LINE_RE = re.compile(r'[^\S\n]*([^\n]*?)[^\S\n]*(?:\n|\Z)')
 
 class GrammarRule:
     """
     Represents a single rule in an ANTLR grammar with its content and position information.
+    The content can also be given as its lines, which are only joined (with spaces) on first access.
     """
-    def __init__(self, name: str, content: str, start_line: int, end_line: int, start_pos: int, end_pos: int):
-        self.name = name
-        self.content = content
+    def __init__(self, name: str, content: Union[str, Sequence[str]], start_line: int, end_line: int, start_pos: int, end_pos: int):
+        self.name = sys.intern(name)
+        self._content: Optional[str] = content if isinstance(content, str) else None
+        self._content_parts: Optional[Sequence[str]] = None if isinstance(content, str) else content
         self.start_line = start_line
         self.end_line = end_line
         self.start_pos = start_pos
         self.end_pos = end_pos
 
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            self._content = ' '.join(self._content_parts)
+            self._content_parts = None
+        return self._content
+
+    @content.setter
+    def content(self, content: str):
+        self._content = content
+        self._content_parts = None
+
 class GrammarFile:
     """
     Handles parsing and storing information about a single ANTLR grammar file.
@@ -39,100 +119,78 @@ class GrammarFile:
     def _load_grammar(self):
         """
         Parses a grammar file to extract rules and imports.
-        Processes the file line by line to:
-        - Track rule definitions and their contents
-        - Record import statements
-        - Maintain position information for each rule
-        - Handle multi-line rules and rule termination
+        The scan (see _scan_grammar_file) is cached per file, the rules are created for every GrammarFile,
+        so changes to them are not seen by other users of the same file.
 
         Raises:
             FileNotFoundError: If grammar file doesn't exist
         """
-        if not os.path.exists(self.path):
-            raise FileNotFoundError(f"Grammar file not found: {self.path}")
-        
-        with open(self.path, 'r', encoding="utf-8") as f:
-            content = f.read()
-            
-        self.content = content
-        
-        # Split content into its lines
-        lines = content.split('\n')
-        current_rule = ''
-        current_content = []
-        start_line = 0
-        start_pos = 1
-        current_pos = 1
-        
-        for line_num, line in enumerate(lines):
-            # Remove indent for parsing but keep original position
-            stripped_line = line.strip()
-
-            # Account for the indent
-            current_pos = len(line) - len(stripped_line) + 1
-
-            # Check for imports
-            if stripped_line.startswith('import'):
-                # Extract imported grammar name
-                import_match = re.match(r'import\s+([^;]+);?', stripped_line)
-                if import_match:
-                    imported_grammar = import_match.group(1).strip()
-                    self.imports.append(imported_grammar)
-                continue
-
-            # Skip comments and grammar definition
-            if not stripped_line or stripped_line.startswith('//') or stripped_line.startswith('grammar') or stripped_line.startswith('import'):
-                continue
-                
-            if ':' in stripped_line:
-                # If we had a previous rule, save it
-                if current_rule:
-                    rule_content = ' '.join(current_content)
-                    self.rules[current_rule] = GrammarRule(
-                        current_rule,
-                        rule_content,
-                        start_line,
-                        line_num -1,
-                        start_pos,
-                        len(rule_content) + 1
-                    )
-                
-                # Extract rule name and start new rule
-                rule_name = line.split(':')[0].strip()
-                current_rule = rule_name
-                # Keep the full line including the rule name
-                current_content = [stripped_line]
-                start_line = line_num
-                start_pos = current_pos
-
-            elif current_rule:
-                # Add lines to current rule content until we find a rule end
-                current_content.append(stripped_line)
-                # If line ends with semicolon, this rule is complete
-                if stripped_line.endswith(';'):
-                    rule_content = ' '.join(current_content)
-                    self.rules[current_rule] = GrammarRule(
-                        current_rule,
-                        rule_content,
-                        start_line,
-                        line_num,
-                        start_pos,
-                        len(rule_content) + 1
-                    )
-                    current_rule = ''
-                    current_content = []
-                    
-        # Cleanup when file doesn't end with semicolon or empty line
-        if current_rule:
-            rule_content = ' '.join(current_content)
-            self.rules[current_rule] = GrammarRule(
-                current_rule,
-                rule_content,
-                start_line,
-                len(lines) - 1,
-                start_pos,
-                len(lines[-1]) + 1
-            )
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Grammar file not found: {self.path}") from None
+
+        self.content, imports, rules = _scan_grammar_file(self.path, stat.st_mtime_ns, stat.st_size)
+        self.imports = list(imports)
+        for rule_name, rule_lines, start_line, end_line, start_pos, end_pos in rules:
+            self.rules[rule_name] = GrammarRule(rule_name, rule_lines, start_line, end_line, start_pos, end_pos)
+
+@functools.lru_cache(maxsize=128)
+def _scan_grammar_file(path: str, mtime_ns: int, size: int) -> Tuple[str, Tuple[str, ...], Tuple[tuple, ...]]:
+    """
+    Scans the grammar file at `path` with the module level patterns to:
+    - Record import statements
+    - Track rule definitions and their contents (multi-line rules included)
+    - Maintain position information for each rule
+    The modification time and size are only part of the cache key, so a file is scanned again as soon
+    as it changes on disk. Only immutable data is cached: the content, the imports and for every rule
+    its name, lines, start and end line, start position and end position.
+    """
+    with open(path, 'r', encoding="utf-8") as f:
+        content = f.read()
+
+    # Check for imports
+    imports = tuple(import_match.group(1).strip() for import_match in _IMPORT_RE.finditer(content))
+
+    # Rules are found in file order, so line numbers are counted incrementally
+    rules = []
+    line = 0
+    counted_up_to = 0
+    pos = 0
+    while True:
+        rule_match = _RULE_RE.search(content, pos)
+        if rule_match is None:
+            break
+        if rule_match.group('name') is None:
+            # An unterminated block comment runs to the end of the file
+            terminator = '*/' if rule_match.group() == '/*' else '\n'
+            comment_end = content.find(terminator, rule_match.end())
+            if comment_end < 0:
+                break
+            pos = comment_end + len(terminator)
+            continue
+        rule_start = rule_match.start('name')
+        rule_end = _rule_end(content, rule_match.end())
+        pos = rule_end
+        line += content.count('\n', counted_up_to, rule_start)
+        counted_up_to = rule_start
+        start_line = line
+        end_line = line + content.count('\n', rule_start, rule_end - 1)
+        # Account for the indent
+        start_pos = rule_start - (content.rfind('\n', 0, rule_start) + 1) + 1
+
+        # Keep the full rule text including the rule name, one stripped line after the other
+        # (joined by GrammarRule when the content is first used)
+        rule_lines = tuple(
+            stripped_line for stripped_line in
+            (line_match.group(1) for line_match in _LINE_RE.finditer(content, rule_start, rule_end))
+            if stripped_line and not stripped_line.startswith('//')
+        )
+        # length of the joined content, i.e. the lines plus one separating space each
+        content_len = sum(map(len, rule_lines)) + max(len(rule_lines) - 1, 0)
+
+        rules.append((rule_match.group('name'), rule_lines, start_line, end_line, start_pos, content_len + 1))
+    return content, imports, tuple(rules)
 
 class UserGrammar:
     """
@@ -142,10 +200,12 @@ class UserGrammar:
     Attributes:
         grammar_files (Dict[str, GrammarFile]): Loaded grammar files by path
         processed_files (Set[str]): Set of already processed file paths
+        _rule_index (Dict[str, GrammarRule]): Rules of all files, the first file defining a rule wins
     """
     def __init__(self):
         self.grammar_files: Dict[str, GrammarFile] = {}
         self.processed_files: Set[str] = set()
+        self._rule_index: Dict[str, GrammarRule] = {}
         
     def add_grammar_file(self, path: str) -> None:
         """Add a grammar file and recursively process its imports"""
@@ -156,6 +216,9 @@ class UserGrammar:
         self.processed_files.add(abs_path)
         grammar_file = GrammarFile(abs_path)
         self.grammar_files[abs_path] = grammar_file
+        # Like ANTLR, a rule of the importing grammar takes precedence over an imported one
+        for name, rule in grammar_file.rules.items():
+            self._rule_index.setdefault(name, rule)
         
         # Process imports
         base_dir = os.path.dirname(abs_path)
@@ -171,26 +234,20 @@ class UserGrammar:
         """Find a grammar file by name in the given directory"""
         # Try exact name
         exact_path = os.path.join(search_dir, grammar_name)
-        if os.path.exists(exact_path):
+        if os.path.isfile(exact_path):
             return exact_path
             
         # Try with .g4 extension
         g4_path = os.path.join(search_dir, f"{grammar_name}.g4")
-        if os.path.exists(g4_path):
+        if os.path.isfile(g4_path):
             return g4_path
             
         return None
     
     def get_rules(self) -> Dict[str, GrammarRule]:
         """Get all rules from all grammar files"""
-        all_rules = {}
-        for grammar_file in self.grammar_files.values():
-            all_rules.update(grammar_file.rules)
-        return all_rules
+        return dict(self._rule_index)
     
     def get_rule_by_name(self, name: str) -> Optional[GrammarRule]:
         """Get a specific rule by name"""
-        for grammar_file in self.grammar_files.values():
-            if name in grammar_file.rules:
-                return grammar_file.rules[name]
-        return None
\ No newline at end of file
+        return self._rule_index.get(name)
\ No newline at end of file
@@ -5,6 +5,11 @@ import os
 import sys
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # optional, the parse tree dump falls back to the json module
+    orjson = None
+
 from paredros_debugger.ParseInformation import ParseInformation
 from paredros_debugger.ParseTraceTree import ParseTraceTree
 from paredros_debugger.ParseTreeExplorer import ParseTreeExplorer
@@ -18,14 +23,14 @@ def get_file_path(arg_value: str, default_path: str, arg_name: str) -> str:
     """
     if arg_value is None:
         # Attempt fallback
-        if not (os.path.exists(default_path) and os.path.isfile(default_path)):
+        if not os.path.isfile(default_path):
             print(f"Error: No {arg_name} provided and default '{default_path}' does not exist or is not a file.")
             sys.exit(1)
         return os.path.abspath(default_path)
     else:
         # Validate user-provided path
         abs_path = os.path.abspath(arg_value)
-        if not (os.path.exists(abs_path) and os.path.isfile(abs_path)):
+        if not os.path.isfile(abs_path):
             print(f"Error: The {arg_name} '{abs_path}' does not exist or is not a file.")
             sys.exit(1)
         return abs_path
@@ -89,8 +94,12 @@ def visualize_parsing(grammar_file, input_file, verbose: bool =False):
     if verbose:
         now_str = datetime.now().strftime("%Y%m%d_%H%M%S")
         out_file = f"parseTree_{now_str}.json"
-        with open(out_file, "w", encoding="utf-8") as f:
-            f.write(parse_tree.to_json(indent=2, verbose=verbose))
+        if orjson is not None:
+            with open(out_file, "wb") as f:
+                f.write(orjson.dumps(parse_tree.to_dict(verbose=verbose), option=orjson.OPT_INDENT_2))
+        else:
+            with open(out_file, "w", encoding="utf-8") as f:
+                f.write(parse_tree.to_json(indent=2, verbose=verbose))
 
         print(f"Final parse tree written to {out_file}")
 
@@ -100,6 +109,17 @@ def visualize_parsing(grammar_file, input_file, verbose: bool =False):
     # Start the interactive REPL
     interactive_explorer_repl(explorer, parse_info, verbose)
 
+_MENU = """
+Options:
+  (b)ack one step
+  (f)orward one step
+  (n)ext decision
+  (pd) previous decision
+  (a)lternative expansion (will immediately ask for alt index)
+  (r)eset to a specific step ID
+  (h)elp (re-show commands)
+  (q)uit"""
+
 def interactive_explorer_repl(
     explorer: ParseTreeExplorer, 
     parse_info: ParseInformation, 
@@ -114,37 +134,33 @@ def interactive_explorer_repl(
     print("You can step through the parse, explore or choose alternatives, etc.\n")
 
     while True:
+        # The whole step display is collected and written at once instead of one print per line
+        out = []
+
         # 1) Show partial parse tree so far
-        print(f"\n===== CURRENT PARTIAL TREE (cut at step_id={explorer.current_step_id}) =====")
-        print(explorer.to_json(verbose))
+        out.append(f"\n===== CURRENT PARTIAL TREE (cut at step_id={explorer.current_step_id}) =====")
+        out.append(explorer.to_json(verbose))
 
         # 2) Show current step info
         cur_node = explorer._get_working_tree_step(explorer.current_step_id)
         if cur_node:
-            print("\n----- Current Parse Step Info -----")
-            print(f" Step ID: {cur_node.id}")
-            print(f" Node Type: {cur_node.node_type}")
-            print(f" Rule Name: {cur_node.rule_name}")
-            print(f" Current Token: {cur_node.current_token}")
-            print(f" Chosen Alt: {cur_node.chosen_transition_index}")
-            print(f" Matching Error? {cur_node.matching_error}")
-            print(f" Possible Alts: {len(cur_node.possible_transitions)}")
+            out.append("\n----- Current Parse Step Info -----")
+            out.append(f" Step ID: {cur_node.id}")
+            out.append(f" Node Type: {cur_node.node_type}")
+            out.append(f" Rule Name: {cur_node.rule_name}")
+            out.append(f" Current Token: {cur_node.current_token}")
+            out.append(f" Chosen Alt: {cur_node.chosen_transition_index}")
+            out.append(f" Matching Error? {cur_node.matching_error}")
+            out.append(f" Possible Alts: {cur_node.num_alternatives}")
             if cur_node.next_input_token or cur_node.next_input_literal:
-                print(f" Next Input Token: {cur_node.next_input_token}")
-                print(f" Next Input Literal: {cur_node.next_input_literal}")
+                out.append(f" Next Input Token: {cur_node.next_input_token}")
+                out.append(f" Next Input Literal: {cur_node.next_input_literal}")
         else:
-            print("\n(No parse node at this step -- possibly at start or end of parse)")
+            out.append("\n(No parse node at this step -- possibly at start or end of parse)")
 
         # 3) Print menu
-        print("\nOptions:")
-        print("  (b)ack one step")
-        print("  (f)orward one step")
-        print("  (n)ext decision")
-        print("  (pd) previous decision")
-        print("  (a)lternative expansion (will immediately ask for alt index)")
-        print("  (r)eset to a specific step ID")
-        print("  (h)elp (re-show commands)")
-        print("  (q)uit")
+        out.append(_MENU)
+        sys.stdout.write("\n".join(out) + "\n")
 
         cmd = input("Enter command (or press Enter for default): ").strip().lower()
 
@@ -153,7 +169,7 @@ def interactive_explorer_repl(
             # If we're in alt-expansion mode, choose the default alt
             if explorer._in_alternative_expansion_mode:
                 default_alt = 1
-                if cur_node and cur_node.chosen_transition_index > 0:
+                if cur_node and cur_node.is_committed:
                     default_alt = cur_node.chosen_transition_index
                 try:
                     explorer.choose_alternative(default_alt)
@@ -211,7 +227,7 @@ def interactive_explorer_repl(
             if alt_str == "":
                 # default alt
                 default_alt = 1
-                if cur_node and cur_node.chosen_transition_index > 0:
+                if cur_node and cur_node.is_committed:
                     default_alt = cur_node.chosen_transition_index
                 try:
                     explorer.choose_alternative(default_alt)
@@ -3,12 +3,44 @@ This Module contains helper functions for the CLI tool and the ParseInformation
 The functions are used to generate the parser, modify the generated parser files, and load the parser and lexer classes dynamically.
 """
 
-import importlib
+import atexit
+import functools
+import hashlib
+import importlib.util
+import mmap
 import os
+import re
 import subprocess
 import sys
+import threading
+from collections import namedtuple
 from paredros_debugger.ModifyGrammarParserFile import modify_parser_file
-from antlr4 import CommonTokenStream
+from antlr4 import CommonTokenStream, DFA, ParserATNSimulator, PredictionContextCache
+
+# grammar path -> (digest of its content, (lexer class, parser class, start rule)), see prepare_grammar.
+# Only the latest version of a grammar is kept, and at most _GRAMMAR_CACHE_SIZE grammars (oldest first out).
+_GRAMMAR_CACHE = {}
+_GRAMMAR_CACHE_SIZE = 32
+
+# jpype and the ANTLR Tool class of a JVM in this process, False if it is not available, see _get_antlr_jvm
+_ANTLR_JVM = None
+# Guards the start of the JVM and the redirected Java output streams while the tool runs
+_ANTLR_JVM_LOCK = threading.Lock()
+
+# The ANTLR complete jar as named by ANTLR's download page, e.g. antlr-4.13.2-complete.jar
+_ANTLR_JAR_RE = re.compile(r'antlr4?-[\d.]+-complete\.jar')
+
+# Guards the import of generated lexer and parser modules and their temporary sys.path entry, see _import_generated
+_IMPORT_LOCK = threading.Lock()
+
+# Either a comment (an unterminated block comment runs to the end of the file) or a rule name
+# at the start of a line followed by its colon, possibly after whitespace and comments.
+# Used on the raw bytes of the grammar, the first match with a name is the start rule.
+_START_RULE_RE = re.compile(
+    rb'//[^\n]*|/\*(?:.*?\*/|.*\Z)'
+    rb'|^[ \t]*([A-Za-z_]\w*)(?:\s|//[^\n]*|/\*.*?\*/)*:',
+    re.MULTILINE | re.DOTALL,
+)
 
 def find_grammar_file(folder_path):
     """
@@ -20,14 +52,119 @@ def find_grammar_file(folder_path):
     Returns:
         str: The name of the grammar file if found, otherwise None.
     """
-    for file in os.listdir(folder_path):
-        if file.endswith(".g4"):
-            return file
+    # scandir entries carry their file type, so no extra stat per entry is needed
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.name.endswith(".g4") and entry.is_file():
+                return entry.name
+    return None
+
+def _is_newer_than(paths, reference_path):
+    """
+    Checks whether all given files exist and are at least as new as the reference file.
+
+    Args:
+        paths (list): The paths of the files to check.
+        reference_path (str): The path of the file they are compared against.
+
+    Returns:
+        bool: True if every file exists and was written after the last change of the reference
+    """
+    try:
+        reference_mtime = os.path.getmtime(reference_path)
+        return all(os.path.getmtime(path) >= reference_mtime for path in paths)
+    except OSError:
+        return False
+
+def _force_regeneration():
+    """Returns True if the PAREDROS_FORCE_REGEN environment variable is set (to anything but 0)."""
+    return os.environ.get("PAREDROS_FORCE_REGEN", "") not in ("", "0")
+
+def _find_antlr_jar():
+    """
+    Returns the path of the ANTLR complete jar: the PAREDROS_ANTLR_JAR environment variable, or else
+    the ANTLR jar on the CLASSPATH (as set up by ANTLR's installation instructions).
+    None if neither names a jar.
+    """
+    jar = os.environ.get("PAREDROS_ANTLR_JAR")
+    if jar:
+        return jar
+    for entry in os.environ.get("CLASSPATH", "").split(os.pathsep):
+        if _ANTLR_JAR_RE.fullmatch(os.path.basename(entry)) and os.path.isfile(entry):
+            return entry
     return None
 
+def _get_antlr_jvm():
+    """
+    Returns jpype and the ANTLR Tool class of a JVM running in this process, the JVM is started on first use
+    and kept until the interpreter exits. Returns None if jpype is not installed or no ANTLR jar is configured.
+    Must be called with _ANTLR_JVM_LOCK held.
+
+    Raises:
+        Exception: If the JVM cannot be started or the jar has no ANTLR Tool (e.g. no Java installed)
+    """
+    global _ANTLR_JVM
+    if _ANTLR_JVM is None:
+        try:
+            import jpype
+        except ImportError:
+            jpype = None
+        jar = _find_antlr_jar()
+        if jpype is None or jar is None:
+            _ANTLR_JVM = False
+        else:
+            if not jpype.isJVMStarted():
+                jpype.startJVM(classpath=[jar])
+                atexit.register(jpype.shutdownJVM)
+            _ANTLR_JVM = (jpype, jpype.JClass("org.antlr.v4.Tool"))
+    return _ANTLR_JVM or None
+
+def _run_antlr_in_process(jpype, tool, args):
+    """
+    Runs the ANTLR Tool with the command line `args` in the JVM of this process.
+    Like the antlr4 command run by generate_parser, the tool's output is discarded and its error output captured.
+
+    Returns:
+        tuple: The number of errors and the captured error output
+    """
+    System = jpype.JClass("java.lang.System")
+    ByteArrayOutputStream = jpype.JClass("java.io.ByteArrayOutputStream")
+    PrintStream = jpype.JClass("java.io.PrintStream")
+
+    err = ByteArrayOutputStream()
+    stdout, stderr = System.out, System.err
+    System.setOut(PrintStream(ByteArrayOutputStream(), True, "UTF-8"))
+    System.setErr(PrintStream(err, True, "UTF-8"))
+    try:
+        antlr = tool(jpype.JArray(jpype.JString)(args))
+        antlr.processGrammarsOnCommandLine()
+        num_errors = int(antlr.getNumErrors())
+    finally:
+        System.setOut(stdout)
+        System.setErr(stderr)
+    return num_errors, str(err.toString("UTF-8"))
+
+# The paths of a grammar file and of the files ANTLR generates from it, see _grammar_paths
+_GrammarPaths = namedtuple("_GrammarPaths", "grammar parser lexer tokens")
+
+@functools.lru_cache(maxsize=32)
+def _grammar_paths(folder_path, grammar_file):
+    """Joins the paths of a grammar file and its generated files, once per folder and grammar."""
+    grammar_name = os.path.splitext(grammar_file)[0]
+    return _GrammarPaths(
+        os.path.join(folder_path, grammar_file),
+        os.path.join(folder_path, grammar_name + "Parser.py"),
+        os.path.join(folder_path, grammar_name + "Lexer.py"),
+        os.path.join(folder_path, grammar_name + ".tokens"),
+    )
+
 def generate_parser(folder_path, grammar_file):
     """
     Runs ANTLR4 to generate the parser in the specified folder.
+    If jpype is installed and an ANTLR jar is configured (see _find_antlr_jar), the tool runs in a JVM
+    kept in this process, otherwise the antlr4 command is run as a subprocess.
+    The tool is not run if all generated files are newer than the grammar file,
+    unless the PAREDROS_FORCE_REGEN environment variable is set (to anything but 0).
 
     Args:
         folder_path (str): The path to the folder containing the grammar file.
@@ -35,13 +172,41 @@ def generate_parser(folder_path, grammar_file):
 
     Returns:
         None
+
+    Raises:
+        subprocess.CalledProcessError: If ANTLR4 fails to generate the parser (or to start in process),
+            with its error messages as `stderr`
     """
+    paths = _grammar_paths(folder_path, grammar_file)
+    if not _force_regeneration() and _is_newer_than((paths.parser, paths.lexer, paths.tokens), paths.grammar):
+        return
+
     command = ["antlr4", "-Dlanguage=Python3", grammar_file]
-    subprocess.run(command, cwd=folder_path, check=True)
+    with _ANTLR_JVM_LOCK:
+        try:
+            jvm = _get_antlr_jvm()
+        except Exception as e:
+            raise subprocess.CalledProcessError(1, command, stderr=f"Unable to run ANTLR4 in process: {e}\n") from e
+
+        if jvm is not None:
+            # Same as the antlr4 wrapper run in the grammar folder, without starting a new JVM
+            num_errors, errors = _run_antlr_in_process(*jvm, [
+                "-Dlanguage=Python3",
+                "-Xexact-output-dir", "-o", folder_path,
+                "-lib", folder_path,
+                paths.grammar,
+            ])
+            if num_errors > 0:
+                raise subprocess.CalledProcessError(1, command, stderr=errors)
+            return
+
+    # ANTLR's output is only of interest if it fails, its error messages then come with the exception
+    subprocess.run(command, cwd=folder_path, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
 
 def modify_generated_parser(folder_path):
     """
     Runs the modify_grammar_parser_file.py script to process the generated files and apply CustomParser Naming.
+    An already modified parser file starts with a marker comment and is not rewritten again.
 
     Args:
         folder_path (str): The path to the folder containing the generated parser files.
@@ -51,38 +216,132 @@ def modify_generated_parser(folder_path):
     """
     modify_parser_file(folder_path)
 
-def load_parser_and_lexer(folder_path, grammar_name):
+def _import_generated(folder_path, module_name):
+    """
+    Imports the generated module `module_name` from its file in `folder_path`. The module is registered
+    in sys.modules under a name qualified with the folder, so modules of the same name from different
+    folders do not replace each other. The folder is only on sys.path while the module is executed,
+    for imports of other modules from the grammar folder (e.g. in a @header action).
+    The file is always executed, a module imported before from it is replaced.
+    """
+    qualified_name = "_paredros_{}_{}".format(
+        hashlib.blake2b(folder_path.encode("utf-8"), digest_size=8).hexdigest(), module_name
+    )
+    path = os.path.join(folder_path, module_name + ".py")
+    if not os.path.isfile(path):
+        raise ModuleNotFoundError(f"No module named '{module_name}' in {folder_path}", name=module_name)
+    spec = importlib.util.spec_from_file_location(qualified_name, path)
+    module = importlib.util.module_from_spec(spec)
+    previous = sys.modules.get(qualified_name)
+    sys.modules[qualified_name] = module
+    added_to_path = folder_path not in sys.path
+    if added_to_path:
+        sys.path.insert(0, folder_path)
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        if previous is None:
+            del sys.modules[qualified_name]
+        else:
+            sys.modules[qualified_name] = previous
+        raise
+    finally:
+        if added_to_path:
+            sys.path.remove(folder_path)
+    return module
+
+def _generated_files_version(folder_path, grammar_name):
+    """Returns the modification times and sizes of the generated lexer and parser files (None if missing)."""
+    version = []
+    for suffix in ("Lexer.py", "Parser.py"):
+        try:
+            stat = os.stat(os.path.join(folder_path, grammar_name + suffix))
+        except OSError:
+            return None
+        version.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+@functools.lru_cache(maxsize=32)
+def _load_parser_and_lexer_classes(folder_path, grammar_name, grammar_digest, files_version):
+    """
+    Imports the generated lexer and parser modules, see load_parser_and_lexer.
+    Cached per folder, grammar, grammar digest and version of the generated files,
+    a failed import is not cached.
+    """
+    lexer = grammar_name + "Lexer"
+    parser = grammar_name + "Parser"
+    # Only one thread at a time executes a generated module
+    with _IMPORT_LOCK:
+        return (
+            getattr(_import_generated(folder_path, lexer), lexer),
+            getattr(_import_generated(folder_path, parser), parser),
+        )
+
+def load_parser_and_lexer(folder_path, grammar_name, grammar_digest=None):
     """
     Dynamically load the generated parser and lexer classes from the specified folder.
+    The classes are cached, a different grammar digest or a change of the generated files on disk
+    loads them again from the files.
 
     Args:
         folder_path (str): The path to the folder containing the generated parser files.
         grammar_name (str): The name of the grammar file.
+        grammar_digest (str): Digest of the grammar content the files were generated from.
 
     Returns:
         tuple: A tuple containing the lexer and parser classes
 
     """
-    sys.path.insert(0, folder_path)  # Ensure the folder is in the Python path
-
     try:
-        lexer = grammar_name + "Lexer"
-        parser = grammar_name + "Parser"
-        lexer_module = importlib.import_module(lexer)
-        parser_module = importlib.import_module(parser)
-
-        lexer_class = getattr(lexer_module, lexer)
-        parser_class = getattr(parser_module, parser)
-
-        return lexer_class, parser_class
+        return _load_parser_and_lexer_classes(
+            folder_path, grammar_name, grammar_digest, _generated_files_version(folder_path, grammar_name)
+        )
     except ImportError as e:
         print(f"Error: Unable to load the generated parser/lexer: {e}")
         sys.exit(1)
 
+def prepare_grammar(folder_path, grammar_file):
+    """
+    Generates and modifies the parser for a grammar, loads its lexer and parser classes and
+    determines the start rule. The result is cached for this process per grammar file and content,
+    so preparing an unchanged grammar again skips all of these steps.
+
+    Args:
+        folder_path (str): The path to the folder containing the grammar file.
+        grammar_file (str): The name of the grammar file.
+
+    Returns:
+        tuple: The lexer class, the parser class and the name of the start rule
+
+    Raises:
+        subprocess.CalledProcessError: If ANTLR4 fails to generate the parser
+        ParserModificationError: If the generated parser file has no parser class
+    """
+    paths = _grammar_paths(folder_path, grammar_file)
+    grammar_path = os.path.abspath(paths.grammar)
+    with open(grammar_path, 'rb') as f:
+        digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+    cached = _GRAMMAR_CACHE.get(grammar_path)
+    if cached is not None and cached[0] == digest:
+        return cached[1]
+
+    generate_parser(folder_path, grammar_file)
+    modify_generated_parser(paths.parser)
+    lexer_class, parser_class = load_parser_and_lexer(folder_path, os.path.splitext(grammar_file)[0], digest)
+    prepared = (lexer_class, parser_class, get_start_rule(grammar_path))
+    # A changed grammar replaces its previous version (and moves to the end of the eviction order)
+    _GRAMMAR_CACHE.pop(grammar_path, None)
+    _GRAMMAR_CACHE[grammar_path] = (digest, prepared)
+    if len(_GRAMMAR_CACHE) > _GRAMMAR_CACHE_SIZE:
+        del _GRAMMAR_CACHE[next(iter(_GRAMMAR_CACHE))]
+    return prepared
+
 def get_start_rule(grammar_file):
     """
     Extracts the first rule definition from the grammar file
     to determine the starting rule for parsing.
+    The result is cached per file and only looked up again once the file changes on disk.
      
     Args:
         grammar_file (str): The path to the grammar file.
@@ -90,24 +349,76 @@ def get_start_rule(grammar_file):
     Returns:
         str: The name of the first rule definition in the grammar
     """
+    path = os.path.abspath(grammar_file)
     try:
-        with open(grammar_file, 'r', encoding="utf-8") as f:
-            for line in f:
-                # Skip empty lines and comments
-                if line.strip() and not line.strip().startswith('//'):
-                    # Look for the first rule definition
-                    if ':' in line:
-                        # Extract rule name before the colon
-                        extracted_rule_names = line.split(':')[0].strip()
-                        return extracted_rule_names
+        stat = os.stat(path)
     except FileNotFoundError:
         return ''
+    return _scan_start_rule(path, stat.st_mtime_ns, stat.st_size)
 
+@functools.lru_cache(maxsize=32)
+def _scan_start_rule(path, mtime_ns, size):
+    """
+    Scans the grammar file at `path` for its first rule, see get_start_rule. The modification time
+    and size are only part of the cache key. The file is memory mapped and scanned until the first rule,
+    only the rule name is decoded.
+    """
+    if size == 0:
+        return None
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Comments are matched as a whole, so a colon inside of them is not taken for a rule
+            for match in _START_RULE_RE.finditer(mm):
+                if match.group(1) is not None:
+                    return match.group(1).decode("utf-8")
+            return None
+    except FileNotFoundError:
+        return ''
+
+def make_thread_safe(parser):
+    """
+    Gives the parser its own DFA cache and prediction context cache instead of the ones shared by all
+    instances of the generated parser class. Opt-in for parsing in several threads at once, where the
+    shared caches would make the threads wait on each other. The caches then start out empty,
+    so a single-threaded parser should keep the shared ones.
+    Must be called before the interpreter is replaced (e.g. by the LookaheadVisualizer), which takes
+    over the caches of the current interpreter.
+
+    Args:
+        parser (Parser): The parser instance to detach from the shared caches.
 
+    Returns:
+        Parser: The same parser
+    """
+    atn = parser._interp.atn
+    decision_to_dfa = [DFA(state, i) for i, state in enumerate(atn.decisionToState)]
+    parser._interp = ParserATNSimulator(parser, atn, decision_to_dfa, PredictionContextCache())
+    return parser
+
+def reset_parser_caches(parser):
+    """
+    Empties the DFA cache and the prediction context cache of the parser's interpreter.
+    Both only ever grow, so a process that parses many files with the same grammar can call this
+    between files to bound its memory use. The caches are emptied in place: unless the parser was
+    made thread safe (see make_thread_safe), this resets them for all instances of its class.
+
+    Args:
+        parser (Parser): The parser whose caches are emptied.
+
+    Returns:
+        None
+    """
+    interp = parser._interp
+    interp.decisionToDFA[:] = [DFA(state, i) for i, state in enumerate(interp.atn.decisionToState)]
+    if interp.sharedContextCache is not None:
+        interp.sharedContextCache.cache.clear()
 
 def copy_token_stream(original_stream: CommonTokenStream) -> CommonTokenStream:
     """
     Creates a copy of the given CommonTokenStream with the same tokens and index.
+    The copy shares the token list with the original stream, so only the position is per stream.
+    The original stream is filled (up to EOF) first: the list is complete and no stream fetches
+    from the shared token source again, which would otherwise append a second EOF token.
     
     :param original_stream: The CommonTokenStream to copy
     :return: A new CommonTokenStream instance with the same tokens and position
@@ -115,11 +426,15 @@ def copy_token_stream(original_stream: CommonTokenStream) -> CommonTokenStream:
     if not isinstance(original_stream, CommonTokenStream):
         raise TypeError("Expected a CommonTokenStream")
 
+    if not original_stream.fetchedEOF:
+        original_stream.fill()
+
     # Create a new stream using the same token source
     copied_stream = CommonTokenStream(original_stream.tokenSource)
 
-    # Copy token list and set the same position
-    copied_stream.tokens = original_stream.tokens[:]
+    # Share the (complete) token list and set the same position
+    copied_stream.tokens = original_stream.tokens
+    copied_stream.fetchedEOF = True
     copied_stream.seek(original_stream.index)
 
     return copied_stream
\ No newline at end of file
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from paredros_debugger.ModifyGrammarParserFile import ParserModificationError, modify_parser_file
+
+# The start of a parser file as generated by ANTLR
+GENERATED_PARSER = (
+    "# Generated from G.g4 by ANTLR 4.13.2\n"
+    "# encoding: utf-8\n"
+    "from antlr4 import *\n"
+    "\n"
+    "class GParser ( Parser ):\n"
+    "    grammarFileName = \"G.g4\"\n"
+)
+
+
+class ModifyParserFileTest(unittest.TestCase):
+    """modify_parser_file on generated parser files, with and without an encoding declaration."""
+
+    def modify(self, content):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, "GParser.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        modify_parser_file(path)
+        with open(path, encoding="utf-8") as f:
+            return path, f.read()
+
+    def test_encoding_declaration_stays_on_the_first_two_lines(self):
+        _, modified = self.modify(GENERATED_PARSER)
+        self.assertEqual(modified.splitlines(), [
+            "# Generated from G.g4 by ANTLR 4.13.2",
+            "# encoding: utf-8",
+            "# paredros-modified",
+            "from antlr4 import *",
+            "",
+            "from paredros_debugger.CustomParser import CustomParser",
+            "class GParser ( CustomParser ):",
+            "    grammarFileName = \"G.g4\"",
+        ])
+
+    def test_marker_comes_first_without_an_encoding_declaration(self):
+        _, modified = self.modify("from antlr4 import *\nclass GParser ( Parser ):\n    pass\n")
+        self.assertEqual(modified.splitlines()[0], "# paredros-modified")
+        self.assertIn("class GParser ( CustomParser ):", modified)
+
+    def test_modified_file_is_left_unchanged(self):
+        path, modified = self.modify(GENERATED_PARSER)
+        modify_parser_file(path)
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), modified)
+
+    def test_file_without_parser_class_is_rejected(self):
+        with self.assertRaises(ParserModificationError):
+            self.modify("# encoding: utf-8\nfrom antlr4 import *\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+import unittest
+
+from paredros_debugger.UserGrammar import GrammarFile, UserGrammar
+
+
+class GrammarFileRuleScanTest(unittest.TestCase):
+    """Rule scanning of GrammarFile on rule bodies that used to make the scan backtrack."""
+
+    def load(self, content):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "G.g4")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            return GrammarFile(path)
+
+    def test_nested_actions_with_commented_alternatives(self):
+        alternatives = "".join(f"  | b // alt {i}\n" for i in range(4))
+        grammar = self.load(
+            "grammar G;\n"
+            "r : a { if x { if y { z(); } } }\n"
+            + alternatives +
+            "  ;\n"
+            "s : c ;\n"
+        )
+        self.assertEqual(list(grammar.rules), ["r", "s"])
+        self.assertEqual(grammar.rules["r"].start_line, 1)
+        self.assertEqual(grammar.rules["r"].end_line, 6)
+        self.assertTrue(grammar.rules["r"].content.startswith("r : a { if x { if y { z(); } } } | b"))
+
+    def test_many_comments_and_unterminated_string(self):
+        comments = "".join(f"  // comment {i}\n" for i in range(5))
+        grammar = self.load(
+            "grammar G;\n"
+            "r : a\n"
+            + comments +
+            "  'x\n"
+            "  ;\n"
+            "s : c ;\n"
+        )
+        self.assertEqual(list(grammar.rules), ["r", "s"])
+        self.assertEqual(grammar.rules["r"].content, "r : a 'x ;")
+
+    def test_semicolons_inside_rule_elements(self):
+        grammar = self.load(
+            "grammar G;\n"
+            "r : 'a;' [;\\]] /* ; */ {;} // ;\n"
+            "  ;\n"
+            "fragment F : 'f' ;\n"
+        )
+        self.assertEqual(list(grammar.rules), ["r", "fragment F"])
+        self.assertEqual(grammar.rules["r"].end_line, 2)
+
+    def test_commented_out_rules_are_skipped(self):
+        grammar = self.load(
+            "grammar G;\n"
+            "// a : b ;\n"
+            "/* c : d ;\n"
+            "   e : f ; */\n"
+            "r : a ;\n"
+            "/* unterminated\n"
+            "s : b ;\n"
+        )
+        self.assertEqual(list(grammar.rules), ["r"])
+        self.assertEqual(grammar.rules["r"].start_line, 4)
+
+    def test_performance_guard_scan_is_not_exponential(self):
+        # Performance guard: the former rule pattern took minutes (exponential in the number of
+        # comments and alternatives) on this rule, the limit only has to tell that apart.
+        content = (
+            "grammar G;\n"
+            "r : a { if x { if y { z(); } } }\n"
+            + "".join(f"  | b // alt {i}\n" for i in range(40)) +
+            "  'x\n"
+            "  ;\n"
+        )
+        start = time.perf_counter()
+        grammar = self.load(content)
+        self.assertLess(time.perf_counter() - start, 10.0)
+        self.assertEqual(list(grammar.rules), ["r"])
+
+
+class UserGrammarCacheTest(unittest.TestCase):
+    """Grammar files are scanned once, but every UserGrammar gets rules of its own."""
+
+    def test_rules_are_not_shared_between_grammars(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "G.g4")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("grammar G;\nr : a ;\n")
+
+            first = UserGrammar()
+            first.add_grammar_file(path)
+            first.get_rule_by_name("r").content = "changed"
+            first.get_rules().pop("r")
+            first.grammar_files[os.path.abspath(path)].rules.clear()
+
+            second = UserGrammar()
+            second.add_grammar_file(path)
+            self.assertEqual(second.get_rule_by_name("r").content, "r : a ;")
+            self.assertEqual(list(second.grammar_files[os.path.abspath(path)].rules), ["r"])
+
+
+if __name__ == "__main__":
+    unittest.main()
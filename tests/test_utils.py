@@ -0,0 +1,214 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from antlr4 import CommonTokenStream
+from antlr4.Token import CommonToken, Token
+
+from paredros_debugger import utils
+from paredros_debugger.utils import copy_token_stream, generate_parser, prepare_grammar
+
+
+class StubTokenSource:
+    """Returns three tokens of type 1, then EOF tokens on every further call."""
+
+    def __init__(self):
+        self.remaining = 3
+
+    def nextToken(self):
+        if self.remaining:
+            self.remaining -= 1
+            return CommonToken(type=1)
+        return CommonToken(type=Token.EOF)
+
+
+def read_to_eof(stream):
+    while stream.LA(1) != Token.EOF:
+        stream.consume()
+    # the parser's lookahead goes past EOF as well
+    stream.LT(2)
+
+
+class CopyTokenStreamTest(unittest.TestCase):
+    """Copies share the token list, so reading to EOF must not append another EOF to it."""
+
+    def token_types(self, stream):
+        return [token.type for token in stream.tokens]
+
+    def test_copy_reaches_eof_first(self):
+        original = CommonTokenStream(StubTokenSource())
+        original.LT(1)
+        copy = copy_token_stream(original)
+        read_to_eof(copy)
+        read_to_eof(original)
+        copy_token_stream(original)
+        self.assertEqual(self.token_types(original), [1, 1, 1, Token.EOF])
+        self.assertIs(copy.tokens, original.tokens)
+        self.assertEqual(original.index, copy.index)
+
+    def test_original_reaches_eof_first(self):
+        original = CommonTokenStream(StubTokenSource())
+        original.LT(1)
+        copy = copy_token_stream(original)
+        read_to_eof(original)
+        read_to_eof(copy)
+        read_to_eof(copy_token_stream(copy))
+        self.assertEqual(self.token_types(original), [1, 1, 1, Token.EOF])
+        self.assertIs(copy.tokens, original.tokens)
+
+    def test_copy_keeps_the_position(self):
+        original = CommonTokenStream(StubTokenSource())
+        original.consume()
+        copy = copy_token_stream(original)
+        self.assertEqual(copy.index, 1)
+        copy.consume()
+        self.assertEqual(original.index, 1)
+
+
+
+class PrepareGrammarCacheTest(unittest.TestCase):
+    """prepare_grammar keeps only the latest version of a grammar."""
+
+    def write_grammar(self, folder, version):
+        """Writes the grammar and (already generated and modified) lexer and parser files for it."""
+        grammar = os.path.join(folder, "G.g4")
+        with open(grammar, "w", encoding="utf-8") as f:
+            f.write(f"grammar G;\nstart{version} : 'x' ;\n")
+        generated = {
+            "GLexer.py": f"class GLexer:\n    VERSION = {version}\n",
+            "GParser.py": f"# paredros-modified\nclass GParser:\n    VERSION = {version}\n",
+            "G.tokens": "",
+        }
+        # newer than the grammar, so ANTLR is not run
+        mtime = os.stat(grammar).st_mtime + 10 * version
+        for name, content in generated.items():
+            path = os.path.join(folder, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.utime(path, (mtime, mtime))
+
+    def test_changed_grammar_replaces_its_cache_entry(self):
+        with tempfile.TemporaryDirectory() as folder:
+            grammar = os.path.abspath(os.path.join(folder, "G.g4"))
+            self.write_grammar(folder, 1)
+            lexer, old_parser, start_rule = prepare_grammar(folder, "G.g4")
+            self.assertEqual((lexer.VERSION, old_parser.VERSION, start_rule), (1, 1, "start1"))
+            self.assertIs(prepare_grammar(folder, "G.g4")[1], old_parser)
+
+            self.write_grammar(folder, 2)
+            lexer, parser, start_rule = prepare_grammar(folder, "G.g4")
+            self.assertEqual((lexer.VERSION, parser.VERSION, start_rule), (2, 2, "start2"))
+            cached_parsers = [prepared[1] for _, prepared in utils._GRAMMAR_CACHE.values()]
+            self.assertIn(parser, cached_parsers)
+            self.assertNotIn(old_parser, cached_parsers)
+            del utils._GRAMMAR_CACHE[grammar]
+
+    def test_cache_is_bounded(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second, \
+                mock.patch.object(utils, "_GRAMMAR_CACHE", {}), mock.patch.object(utils, "_GRAMMAR_CACHE_SIZE", 1):
+            self.write_grammar(first, 1)
+            self.write_grammar(second, 1)
+            prepare_grammar(first, "G.g4")
+            prepare_grammar(second, "G.g4")
+            self.assertEqual(list(utils._GRAMMAR_CACHE), [os.path.abspath(os.path.join(second, "G.g4"))])
+
+
+
+class GenerateParserInProcessTest(unittest.TestCase):
+    """generate_parser with a mocked jpype: the in-process ANTLR Tool and the fallback to the antlr4 command."""
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        with open(os.path.join(self.folder, "G.g4"), "w", encoding="utf-8") as f:
+            f.write("grammar G;\nstart : 'x' ;\n")
+
+        for patcher in (
+            mock.patch.object(utils, "_ANTLR_JVM", None),
+            mock.patch.object(utils.atexit, "register"),
+            mock.patch.dict(os.environ, {"PAREDROS_ANTLR_JAR": "/opt/antlr-4.13.2-complete.jar", "CLASSPATH": ""}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.run_command = mock.patch.object(utils.subprocess, "run").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def mock_jpype(self, num_errors=0, error_output=""):
+        jpype = mock.MagicMock(name="jpype")
+        jpype.isJVMStarted.return_value = False
+        self.tool = mock.MagicMock(name="Tool")
+        self.tool.return_value.getNumErrors.return_value = num_errors
+        self.system = mock.MagicMock(name="System")
+        self.system.err = "original System.err"
+        buffer = mock.MagicMock(name="ByteArrayOutputStream")
+        buffer.return_value.toString.return_value = error_output
+        classes = {
+            "org.antlr.v4.Tool": self.tool,
+            "java.lang.System": self.system,
+            "java.io.ByteArrayOutputStream": buffer,
+            "java.io.PrintStream": mock.MagicMock(name="PrintStream"),
+        }
+        jpype.JClass.side_effect = classes.__getitem__
+        return jpype
+
+    def test_tool_gets_a_java_string_array(self):
+        jpype = self.mock_jpype()
+        with mock.patch.dict(sys.modules, {"jpype": jpype}):
+            generate_parser(self.folder, "G.g4")
+
+        jpype.startJVM.assert_called_once_with(classpath=["/opt/antlr-4.13.2-complete.jar"])
+        jpype.JArray.assert_called_once_with(jpype.JString)
+        jpype.JArray.return_value.assert_called_once_with([
+            "-Dlanguage=Python3",
+            "-Xexact-output-dir", "-o", self.folder,
+            "-lib", self.folder,
+            os.path.join(self.folder, "G.g4"),
+        ])
+        self.tool.assert_called_once_with(jpype.JArray.return_value.return_value)
+        self.tool.return_value.processGrammarsOnCommandLine.assert_called_once_with()
+        self.run_command.assert_not_called()
+
+    def test_tool_errors_are_raised_with_their_output(self):
+        jpype = self.mock_jpype(num_errors=1, error_output="error(50): G.g4:2:0: syntax error\n")
+        with mock.patch.dict(sys.modules, {"jpype": jpype}):
+            with self.assertRaises(subprocess.CalledProcessError) as raised:
+                generate_parser(self.folder, "G.g4")
+
+        self.assertEqual(raised.exception.stderr, "error(50): G.g4:2:0: syntax error\n")
+        self.assertEqual(self.system.setErr.call_args_list[-1], mock.call("original System.err"))
+        self.run_command.assert_not_called()
+
+    def test_failed_jvm_start_is_raised(self):
+        jpype = self.mock_jpype()
+        jpype.startJVM.side_effect = OSError("No JVM shared library file found")
+        with mock.patch.dict(sys.modules, {"jpype": jpype}):
+            with self.assertRaises(subprocess.CalledProcessError) as raised:
+                generate_parser(self.folder, "G.g4")
+
+        self.assertIn("No JVM shared library file found", raised.exception.stderr)
+        self.run_command.assert_not_called()
+
+    def test_falls_back_to_the_antlr4_command_without_jpype(self):
+        with mock.patch.dict(sys.modules, {"jpype": None}):
+            generate_parser(self.folder, "G.g4")
+
+        self.run_command.assert_called_once_with(
+            ["antlr4", "-Dlanguage=Python3", "G.g4"], cwd=self.folder, check=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+
+    def test_falls_back_to_the_antlr4_command_without_a_jar(self):
+        jpype = self.mock_jpype()
+        with mock.patch.dict(sys.modules, {"jpype": jpype}), mock.patch.dict(os.environ, {"PAREDROS_ANTLR_JAR": ""}):
+            generate_parser(self.folder, "G.g4")
+
+        jpype.startJVM.assert_not_called()
+        self.run_command.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()